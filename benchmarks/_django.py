@@ -0,0 +1,29 @@
+"""Bootstrap Django for benchmark scripts against a scratch database."""
+
+import os
+import sys
+from pathlib import Path
+
+import django
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django(database: str) -> None:
+    """Configure Django for a benchmark and migrate its database.
+
+    Benchmarks default to the single-node ``sqlite`` settings profile
+    (no ``DEBUG``, no debug toolbar) on ``database``, so they never touch
+    the development ``db.sqlite3``; ``CINEMA_PROFILE`` selects another.
+    """
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cinema_service.settings")
+    os.environ.setdefault("CINEMA_PROFILE", "sqlite")
+    os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+    os.environ.setdefault("DJANGO_ALLOWED_HOSTS", "localhost,testserver")
+    os.environ["SQLITE_PATH"] = database
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
@@ -0,0 +1,399 @@
+"""Latency, query count and rows fetched of every cinema API endpoint.
+
+Fills a scratch database once with ``generate_data`` and then calls
+every route of ``cinema/urls.py`` through the test client. Each case is
+run once on a cold cache and ``--repeat`` times warm; the JSON report
+keys cases by stable names, so reports of two commits can be diffed::
+
+    python -m benchmarks.api --days 14 --output report.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from benchmarks._django import ROOT, setup_django
+
+# routes that cannot be timed as a request/response round trip
+SKIPPED = {"async-moviesession-seat-events": "never-ending event stream"}
+SCHEDULE_YEAR = 2100
+
+
+@dataclass
+class Case:
+    name: str
+    route: str
+    method: str = "get"
+    kwargs: Callable = lambda context, i: {}
+    query: Callable = lambda context, i: ""
+    body: Callable | None = None
+    # undoes the request untimed, so every repetition sees the same data
+    cleanup: Callable | None = None
+    statuses: tuple = (200,)
+
+
+def _session(context, i):
+    return {"pk": context["movie_session"]}
+
+
+def _schedule(context, i):
+    """A week of four sessions a day, long after the generated data."""
+    return {
+        "sessions": [
+            {
+                "movie": context["movie"],
+                "cinema_hall": context["cinema_hall"],
+                "show_time": f"{SCHEDULE_YEAR}-01-{day:02}T{hour}:00:00",
+            }
+            for day in range(1, 8)
+            for hour in (10, 13, 16, 19)
+        ]
+    }
+
+
+def _delete_schedule(client, path):
+    from cinema.models import MovieSession
+
+    MovieSession.objects.filter(show_time__year=SCHEDULE_YEAR).delete()
+
+
+CASES = [
+    Case("api-root", "api-root"),
+    Case("genres", "genre-list"),
+    Case("genre", "genre-detail", kwargs=lambda c, i: {"pk": c["genre"]}),
+    Case("actors", "actor-list"),
+    Case("actor", "actor-detail", kwargs=lambda c, i: {"pk": c["actor"]}),
+    Case("cinema-halls", "cinemahall-list"),
+    Case(
+        "cinema-hall",
+        "cinemahall-detail",
+        kwargs=lambda c, i: {"pk": c["cinema_hall"]},
+    ),
+    Case("movies", "movie-list"),
+    Case(
+        "movies-by-genre",
+        "movie-list",
+        query=lambda c, i: f"genres={c['genre']}",
+    ),
+    Case("movies-search", "movie-list", query=lambda c, i: "search=night"),
+    Case("movie", "movie-detail", kwargs=lambda c, i: {"pk": c["movie"]}),
+    Case("movie-sessions", "moviesession-list"),
+    Case(
+        "movie-sessions-by-date",
+        "moviesession-list",
+        query=lambda c, i: f"date={c['date']}",
+    ),
+    Case(
+        "movie-sessions-by-movie-and-date",
+        "moviesession-list",
+        query=lambda c, i: f"movie={c['movie']}&date={c['date']}",
+    ),
+    Case("movie-session", "moviesession-detail", kwargs=_session),
+    Case(
+        "movie-session-bitmap",
+        "moviesession-detail",
+        kwargs=_session,
+        query=lambda c, i: "seat_map=bitmap",
+    ),
+    Case(
+        "movie-session-hold",
+        "moviesession-holds",
+        method="post",
+        kwargs=lambda c, i: {"pk": c["empty_session"]},
+        body=lambda c, i: {"seats": [{"row": 1, "seat": 1}]},
+        cleanup=lambda client, path: client.delete(path),
+        statuses=(201,),
+    ),
+    Case(
+        "movie-session-best-seats",
+        "moviesession-best-seats",
+        kwargs=_session,
+        query=lambda c, i: "count=4",
+    ),
+    Case(
+        "movie-session-hold-best-seats",
+        "moviesession-best-seats",
+        method="post",
+        kwargs=lambda c, i: {"pk": c["empty_session"]},
+        body=lambda c, i: {"count": 4},
+        cleanup=lambda client, path: client.delete(
+            path.replace("best_seats", "holds")
+        ),
+        statuses=(201,),
+    ),
+    Case(
+        "movie-sessions-schedule",
+        "moviesession-schedule",
+        method="post",
+        body=_schedule,
+        cleanup=_delete_schedule,
+        statuses=(201,),
+    ),
+    Case("orders", "orders-list"),
+    Case(
+        "order-create",
+        "orders-list",
+        method="post",
+        body=lambda c, i: {
+            "tickets": [
+                {
+                    "movie_session": c["empty_session"],
+                    "row": i // c["seats_in_row"] + 1,
+                    "seat": i % c["seats_in_row"] + 1,
+                }
+            ]
+        },
+        statuses=(201,),
+    ),
+    Case(
+        "orders-export",
+        "orders-export",
+        query=lambda c, i: f"created_after={c['date']}&"
+        f"created_before={c['date']}",
+    ),
+    Case("async-movie-sessions", "async-moviesession-list"),
+    Case(
+        "async-movie-sessions-by-date",
+        "async-moviesession-list",
+        query=lambda c, i: f"date={c['date']}",
+    ),
+    Case("async-movie-session", "async-moviesession-detail", kwargs=_session),
+    Case("metrics", "metrics"),
+]
+
+
+def route_names() -> set[str]:
+    from django.urls import URLResolver
+
+    from cinema.urls import urlpatterns
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif pattern.name:
+                yield pattern.name
+
+    return set(walk(urlpatterns))
+
+
+def prepare(dataset: list[str]) -> dict:
+    """Generate the dataset if needed and pick the objects cases use."""
+    import datetime
+
+    from django.core.management import call_command
+
+    from cinema.models import CinemaHall, MovieSession, Ticket
+    from user.models import User
+
+    if not Ticket.objects.exists():
+        call_command("generate_data", *dataset)
+
+    movie_session = (
+        MovieSession.objects.filter(tickets_sold__gt=0)
+        .order_by("show_time", "id")
+        .select_related("movie")
+        .first()
+    )
+    hall = CinemaHall.objects.order_by("-rows", "-seats_in_row").first()
+    # a session after all others that order-create can fill seat by seat
+    last = MovieSession.objects.order_by("-show_time").first()
+    empty_session, _ = MovieSession.objects.get_or_create(
+        movie=movie_session.movie,
+        cinema_hall=hall,
+        show_time=last.show_time + datetime.timedelta(days=1),
+    )
+    empty_session.tickets.all().delete()
+    user, _ = User.objects.get_or_create(
+        username="benchmark", defaults={"is_staff": True}
+    )
+    return {
+        "user": user,
+        "movie_session": movie_session.id,
+        "movie": movie_session.movie_id,
+        "genre": movie_session.movie.genres.values_list("id", flat=True)[0],
+        "actor": movie_session.movie.actors.values_list("id", flat=True)[0],
+        "cinema_hall": movie_session.cinema_hall_id,
+        "date": movie_session.show_time.date().isoformat(),
+        "empty_session": empty_session.id,
+        "seats_in_row": hall.seats_in_row,
+    }
+
+
+class QueryRecorder:
+    """``execute_wrapper`` keeping the statements of one request."""
+
+    def __init__(self) -> None:
+        self.statements = []
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.statements.append((sql, params))
+
+    def rows_fetched(self) -> int:
+        """Count the rows every recorded SELECT returns by running it again."""
+        from django.db import connection
+
+        rows = 0
+        with connection.cursor() as cursor:
+            for sql, params in self.statements:
+                if sql.lstrip()[:6].upper() != "SELECT":
+                    continue
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM ({sql}) rows_fetched", params
+                )
+                rows += cursor.fetchone()[0]
+        return rows
+
+
+def request(client, case: Case, context: dict, i: int):
+    from django.db import connection
+    from django.urls import reverse
+
+    path = reverse(f"cinema:{case.route}", kwargs=case.kwargs(context, i))
+    query = case.query(context, i)
+    extra = {}
+    if case.body is not None:
+        extra = {
+            "data": json.dumps(case.body(context, i)),
+            "content_type": "application/json",
+        }
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        started = time.perf_counter()
+        response = getattr(client, case.method)(
+            f"{path}?{query}" if query else path, **extra
+        )
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - started
+    assert response.status_code in case.statuses, (
+        case.name, response.status_code, response.content[:200]
+    )
+    if case.cleanup:
+        case.cleanup(client, path)
+    return elapsed, recorder
+
+
+def measure(client, case: Case, context: dict, repeat: int) -> dict:
+    from django.core.cache import cache
+
+    cache.clear()
+    cold_elapsed, cold = request(client, case, context, 0)
+    cold_rows = cold.rows_fetched()
+    latencies = []
+    for i in range(1, repeat + 1):
+        elapsed, warm = request(client, case, context, i)
+        latencies.append(elapsed * 1000)
+    latencies.sort()
+    return {
+        "route": case.route,
+        "method": case.method.upper(),
+        "cold": {
+            "latency_ms": round(cold_elapsed * 1000, 3),
+            "queries": len(cold.statements),
+            "db_ms": round(cold.seconds * 1000, 3),
+            "rows_fetched": cold_rows,
+        },
+        "warm": {
+            "latency_ms": {
+                "mean": round(statistics.mean(latencies), 3),
+                "p50": round(latencies[len(latencies) // 2], 3),
+                "p95": round(latencies[int(len(latencies) * 0.95)], 3),
+                "min": round(latencies[0], 3),
+            },
+            "queries": len(warm.statements),
+            "db_ms": round(warm.seconds * 1000, 3),
+            "rows_fetched": warm.rows_fetched(),
+        },
+    }
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default="benchmark_api.sqlite3")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default="benchmark_api.json")
+    parser.add_argument(
+        "--case", action="append", help="Only run the named cases."
+    )
+    for option in (
+        "--halls", "--movies", "--users", "--days", "--sessions-per-day",
+        "--fill", "--seed",
+    ):
+        parser.add_argument(option, help="Passed to generate_data.")
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    uncovered = route_names() - {case.route for case in CASES} - set(SKIPPED)
+    if uncovered:
+        parser.error(f"routes without a case: {', '.join(sorted(uncovered))}")
+
+    from django.db import connection
+    from django.test import Client
+
+    from cinema.models import MovieSession, Order, Ticket
+
+    dataset = [
+        f"--{name.replace('_', '-')}={value}"
+        for name, value in vars(args).items()
+        if name in (
+            "halls", "movies", "users", "days", "sessions_per_day", "fill",
+            "seed",
+        )
+        and value is not None
+    ]
+    context = prepare(dataset)
+    client = Client()
+    client.force_login(context["user"])
+
+    report = {
+        "commit": commit(),
+        "database": connection.vendor,
+        "repeat": args.repeat,
+        "dataset": {
+            "movie_sessions": MovieSession.objects.count(),
+            "orders": Order.objects.count(),
+            "tickets": Ticket.objects.count(),
+        },
+        "skipped": SKIPPED,
+        "cases": {},
+    }
+    print(f"{'case':36} {'p50 ms':>8} {'queries':>8} {'rows':>8}")
+    for case in CASES:
+        if args.case and case.name not in args.case:
+            continue
+        result = measure(client, case, context, args.repeat)
+        report["cases"][case.name] = result
+        print(
+            f"{case.name:36} {result['warm']['latency_ms']['p50']:8.2f} "
+            f"{result['cold']['queries']:8} "
+            f"{result['cold']['rows_fetched']:8}"
+        )
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Concurrent seat-map polling: sync views under WSGI vs async under ASGI.
+
+Both applications are driven in-process, so the numbers compare the
+request handling models rather than a web server or the network: the
+WSGI application is called from a pool of ``--concurrency`` threads and
+the ASGI application from as many concurrent asyncio tasks::
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks._django import setup_django
+
+HOST = "localhost"
+
+
+def seed() -> tuple[int, str]:
+    """Return a movie session id and a session cookie of a logged-in user."""
+    from django.contrib.auth import (
+        BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    )
+    from django.contrib.sessions.backends.db import SessionStore
+
+    from cinema.booking import book_tickets
+    from cinema.models import CinemaHall, Movie, MovieSession
+    from user.models import User
+
+    user, _ = User.objects.get_or_create(username="load-test")
+    movie_session = MovieSession.objects.order_by("id").first()
+    if movie_session is None:
+        movie = Movie.objects.create(
+            title="Load test", description="", duration=120
+        )
+        hall = CinemaHall.objects.create(
+            name="Load test", rows=50, seats_in_row=60
+        )
+        movie_session = MovieSession.objects.create(
+            movie=movie, cinema_hall=hall,
+            show_time=datetime.datetime(2024, 1, 1, 20),
+        )
+        book_tickets(user, [
+            {"movie_session": movie_session, "row": row, "seat": seat}
+            for row in range(1, 51, 2)
+            for seat in range(1, 61, 3)
+        ])
+
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return movie_session.id, f"sessionid={session.session_key}"
+
+
+def report(label: str, latencies: list[float], elapsed: float) -> None:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label}: {len(latencies) / elapsed:.0f} req/s, "
+        f"p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+        f"mean {statistics.mean(latencies) * 1000:.1f} ms"
+    )
+
+
+def call_wsgi(
+    application, method: str, path: str, cookie: str, body: bytes = b"",
+    headers: dict | None = None,
+) -> tuple[str, float]:
+    """Call ``application`` once; return the status line and the latency."""
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": HOST,
+        "SERVER_PORT": "80",
+        "HTTP_HOST": HOST,
+        "HTTP_COOKIE": cookie,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": BytesIO(body),
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": BytesIO(),
+        **(headers or {}),
+    }
+    statuses = []
+    started = time.perf_counter()
+    response = application(
+        environ, lambda status, headers: statuses.append(status)
+    )
+    b"".join(response)
+    response.close()
+    return statuses[0], time.perf_counter() - started
+
+
+def run_wsgi(path: str, cookie: str, requests: int, concurrency: int):
+    from cinema_service.wsgi import application
+
+    def call() -> float:
+        status, elapsed = call_wsgi(application, "GET", path, cookie)
+        assert status.startswith("200"), status
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(lambda _: call(), range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+async def run_asgi(path: str, cookie: str, requests: int, concurrency: int):
+    from cinema_service.asgi import application
+
+    disconnect = asyncio.Event()
+
+    async def call() -> float:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", HOST.encode()), (b"cookie", cookie.encode())
+            ],
+            "server": (HOST, 80),
+            "client": ("127.0.0.1", 50000),
+        }
+        messages = [{"type": "http.request", "body": b""}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        statuses = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        started = time.perf_counter()
+        await application(scope, receive, send)
+        assert statuses[0] == 200, statuses[0]
+        return time.perf_counter() - started
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited() -> float:
+        async with semaphore:
+            return await call()
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(limited() for _ in range(requests)))
+    return list(latencies), time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default="benchmark.sqlite3")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    movie_session_id, cookie = seed()
+    sync_path = f"/api/cinema/movie_sessions/{movie_session_id}/"
+    async_path = f"/api/cinema/async/movie_sessions/{movie_session_id}/"
+
+    report(
+        "sync view, WSGI",
+        *run_wsgi(sync_path, cookie, args.requests, args.concurrency),
+    )
+    report(
+        "async view, ASGI",
+        *asyncio.run(
+            run_asgi(async_path, cookie, args.requests, args.concurrency)
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
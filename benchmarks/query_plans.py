@@ -0,0 +1,159 @@
+"""Compare query plans of the movie session and order list queries.
+
+Seeds a scratch SQLite database (one million tickets by default) and, for
+the ``?date=`` filter, the ``?movie=`` filter and the order history query,
+prints the ``EXPLAIN QUERY PLAN`` output and the mean run time of the
+function-over-column form used before and the sargable form used now::
+
+    python -m benchmarks.query_plans --tickets 1000000
+"""
+
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+from benchmarks._django import setup_django
+
+BATCH_SIZE = 5000
+
+
+def seed(tickets: int) -> None:
+    from django.db import transaction
+
+    from cinema.booking import reconcile_tickets_sold
+    from cinema.importer import set_end_times
+    from cinema.models import (
+        CinemaHall, Movie, MovieSession, Order, Ticket
+    )
+    from user.models import User
+
+    if Ticket.objects.count() >= tickets:
+        return
+    print(f"Seeding {tickets} tickets...")
+    rng = random.Random(0)
+    halls = [
+        CinemaHall(name=f"Hall {i}", rows=25, seats_in_row=30)
+        for i in range(10)
+    ]
+    # bulk_create skips the pre_save signals that fill these in
+    for hall in halls:
+        hall.update_capacity()
+    halls = CinemaHall.objects.bulk_create(halls)
+    movies = Movie.objects.bulk_create(
+        Movie(title=f"Movie {i}", description="", duration=120)
+        for i in range(200)
+    )
+    users = User.objects.bulk_create(
+        User(username=f"user{i}") for i in range(2000)
+    )
+    start = datetime.datetime(2024, 1, 1, 10)
+    session_count = tickets // 500 + 1
+    sessions = [
+        MovieSession(
+            movie=rng.choice(movies),
+            cinema_hall=halls[i % len(halls)],
+            show_time=start + datetime.timedelta(
+                days=i // 40, minutes=i % 40 * 18
+            ),
+        )
+        for i in range(session_count)
+    ]
+    set_end_times(sessions)
+    sessions = MovieSession.objects.bulk_create(
+        sessions, batch_size=BATCH_SIZE
+    )
+
+    created = 0
+    with transaction.atomic():
+        while created < tickets:
+            orders = Order.objects.bulk_create(
+                Order(user=rng.choice(users))
+                for _ in range(BATCH_SIZE // 5)
+            )
+            batch = []
+            for index in range(created, min(created + BATCH_SIZE, tickets)):
+                session = sessions[index // 500]
+                row, seat = divmod(index % 500, 30)
+                batch.append(
+                    Ticket(
+                        movie_session=session,
+                        order=orders[index % len(orders)],
+                        row=row + 1,
+                        seat=seat + 1,
+                    )
+                )
+            Ticket.objects.bulk_create(batch)
+            created += len(batch)
+    # bulk_create skips the signals that keep tickets_sold in step
+    list(reconcile_tickets_sold())
+
+
+def measure(label: str, queryset, repeat: int) -> None:
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = [row[-1] for row in cursor.fetchall()]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append(time.perf_counter() - started)
+    print(f"{label}: {statistics.mean(timings) * 1000:.2f} ms")
+    for step in plan:
+        print(f"    {step}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default="benchmark.sqlite3")
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    seed(args.tickets)
+
+    from cinema.models import MovieSession, Order
+
+    session = MovieSession.objects.order_by("id")[
+        MovieSession.objects.count() // 2
+    ]
+    day = session.show_time.date()
+    sessions = MovieSession.objects.with_tickets_available()
+
+    measure(
+        "?date= as show_time__date (before)",
+        sessions.filter(show_time__date=day),
+        args.repeat,
+    )
+    measure(
+        "?date= as half-open show_time range (after)",
+        sessions.filter(
+            show_time__gte=day,
+            show_time__lt=day + datetime.timedelta(days=1),
+        ),
+        args.repeat,
+    )
+    measure(
+        "?movie= ordered by -show_time",
+        sessions.filter(movie=session.movie_id).order_by("-show_time"),
+        args.repeat,
+    )
+    user_id = Order.objects.order_by("id").values_list(
+        "user", flat=True
+    ).first()
+    measure(
+        "orders of one user ordered by -created_at",
+        Order.objects.filter(user=user_id).order_by("-created_at", "-id")[
+            :20
+        ],
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Time of the best-available seat search in large, fragmented halls.
+
+Every third seat of every row is taken, so no row has three adjacent
+free seats and a search for them visits the whole hall::
+
+    python -m benchmarks.seat_finder --rows 50 --seats-in-row 60
+"""
+
+import argparse
+import time
+
+from benchmarks._django import setup_django
+
+# the best-seats endpoint should spend well under this on the search
+BUDGET = 0.001
+
+
+def fragmented_seat_map(rows: int, seats_in_row: int):
+    from cinema.seat_map import SeatMap
+
+    seat_map = SeatMap(rows, seats_in_row)
+    for row in range(1, rows + 1):
+        for seat in range(1, seats_in_row + 1, 3):
+            seat_map.take(row, seat)
+    return seat_map
+
+
+def per_call(seat_map, count: int, calls: int, repeat: int) -> float:
+    from cinema.seat_map import find_best_seats
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            find_best_seats(seat_map, count)
+        best = min(best, (time.perf_counter() - started) / calls)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default="benchmark.sqlite3")
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--seats-in-row", type=int, default=60)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    seat_map = fragmented_seat_map(args.rows, args.seats_in_row)
+    over_budget = False
+    for count in (1, 2, 3, 6):
+        seconds = per_call(seat_map, count, args.calls, args.repeat)
+        over_budget |= seconds > BUDGET
+        print(f"{count} seats: {seconds * 1e6:.1f} us per search")
+    if over_budget:
+        raise SystemExit(f"slower than {BUDGET * 1e3:.0f} ms per search")
+
+
+if __name__ == "__main__":
+    main()
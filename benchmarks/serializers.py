@@ -0,0 +1,121 @@
+"""Per-item cost of the DRF list serializers versus the flat ones.
+
+Rows are fetched once up front, so only serialization is timed::
+
+    python -m benchmarks.serializers --sessions 5000 --movies 2000
+"""
+
+import argparse
+import datetime
+import time
+
+from benchmarks._django import setup_django
+
+
+def seed(sessions: int, movies: int) -> None:
+    from cinema.models import (
+        Actor, CinemaHall, Genre, Movie, MovieSession
+    )
+
+    if MovieSession.objects.count() >= sessions:
+        return
+    genres = Genre.objects.bulk_create(
+        Genre(name=f"Genre {i}") for i in range(20)
+    )
+    actors = Actor.objects.bulk_create(
+        Actor(first_name=f"First {i}", last_name=f"Last {i}")
+        for i in range(200)
+    )
+    created = Movie.objects.bulk_create(
+        Movie(title=f"Movie {i}", description="Description " * 20,
+              duration=120)
+        for i in range(movies)
+    )
+    Movie.genres.through.objects.bulk_create(
+        Movie.genres.through(movie=movie, genre=genres[(i + k) % 20])
+        for i, movie in enumerate(created)
+        for k in range(3)
+    )
+    Movie.actors.through.objects.bulk_create(
+        Movie.actors.through(movie=movie, actor=actors[(i + k) % 200])
+        for i, movie in enumerate(created)
+        for k in range(5)
+    )
+    hall = CinemaHall.objects.create(name="Hall", rows=20, seats_in_row=30)
+    start = datetime.datetime(2024, 1, 1)
+    MovieSession.objects.bulk_create(
+        MovieSession(
+            movie=created[i % len(created)],
+            cinema_hall=hall,
+            show_time=start + datetime.timedelta(hours=i),
+            end_time=start + datetime.timedelta(hours=i, minutes=120),
+        )
+        for i in range(sessions)
+    )
+
+
+def per_item(label: str, serialize, items: int, repeat: int) -> float:
+    best = min(_timed(serialize) for _ in range(repeat))
+    print(f"{label}: {best / items * 1e6:.2f} us per item")
+    return best
+
+
+def _timed(serialize) -> float:
+    started = time.perf_counter()
+    serialize()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default="benchmark.sqlite3")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    seed(args.sessions, args.movies)
+
+    from cinema.flat_serializers import (
+        FlatMovieListSerializer, FlatMovieSessionListSerializer
+    )
+    from cinema.models import Movie, MovieSession
+    from cinema.serializers import (
+        MovieListSerializer, MovieSessionListSerializer
+    )
+
+    sessions = MovieSession.objects.with_tickets_available()
+    instances = list(sessions)
+    rows = list(FlatMovieSessionListSerializer.values(sessions))
+    slow = per_item(
+        "MovieSessionListSerializer",
+        lambda: MovieSessionListSerializer(instances, many=True).data,
+        len(rows), args.repeat,
+    )
+    fast = per_item(
+        "FlatMovieSessionListSerializer",
+        lambda: FlatMovieSessionListSerializer(rows).data,
+        len(rows), args.repeat,
+    )
+    print(f"    {slow / fast:.1f}x faster")
+
+    movies = list(Movie.objects.prefetch_related("genres", "actors"))
+    movie_rows = list(
+        FlatMovieListSerializer.values(Movie.objects.with_names())
+    )
+    slow = per_item(
+        "MovieListSerializer",
+        lambda: MovieListSerializer(movies, many=True).data,
+        len(movie_rows), args.repeat,
+    )
+    fast = per_item(
+        "FlatMovieListSerializer",
+        lambda: FlatMovieListSerializer(movie_rows).data,
+        len(movie_rows), args.repeat,
+    )
+    print(f"    {slow / fast:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
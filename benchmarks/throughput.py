@@ -0,0 +1,155 @@
+"""Request throughput of the settings profiles under a mixed workload.
+
+Every profile runs in its own process, since settings are read once. A
+pool of ``--concurrency`` threads drives the WSGI application in-process
+with seat-map and session-list reads plus one hold/release write pair in
+every ``--write-every`` requests::
+
+    python -m benchmarks.throughput --requests 3000 --concurrency 32
+    POSTGRES_HOST=db python -m benchmarks.throughput --profile postgres
+
+The ``postgres`` profiles read their connection from the ``POSTGRES_*``
+variables; ``postgres-pool`` sets ``POSTGRES_POOL_MAX_SIZE`` to the
+concurrency.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._django import ROOT
+
+PROFILES = {
+    "dev": {"CINEMA_PROFILE": "dev", "DJANGO_DEBUG": "False"},
+    "sqlite": {"CINEMA_PROFILE": "sqlite"},
+    "postgres": {"CINEMA_PROFILE": "postgres"},
+    "postgres-pool": {"CINEMA_PROFILE": "postgres"},
+}
+CSRF_TOKEN = "benchmarkbenchmarkbenchmarkbench"
+
+
+def percentile(latencies: list[float], share: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * share))]
+
+
+def worker(args) -> dict:
+    from benchmarks._django import setup_django
+    from benchmarks.load_test import call_wsgi, seed
+
+    setup_django(args.database)
+
+    from django.db import connection
+
+    from cinema_service.wsgi import application
+
+    movie_session_id, cookie = seed()
+    cookie = f"{cookie}; csrftoken={CSRF_TOKEN}"
+    csrf = {"HTTP_X_CSRFTOKEN": CSRF_TOKEN}
+    detail = f"/api/cinema/movie_sessions/{movie_session_id}/"
+    holds = f"{detail}holds/"
+
+    def call(i: int) -> tuple[str, float, bool]:
+        if i % args.write_every == 0:
+            seat = i // args.write_every % 60 + 1
+            body = json.dumps({"seats": [{"row": 2, "seat": seat}]})
+            posted, post_elapsed = call_wsgi(
+                application, "POST", holds, cookie, body.encode(), csrf
+            )
+            deleted, delete_elapsed = call_wsgi(
+                application, "DELETE", holds, cookie, headers=csrf
+            )
+            # a "database is locked" error surfaces as a 500
+            ok = posted.startswith("201") and deleted.startswith("204")
+            return "write", post_elapsed + delete_elapsed, ok
+        path = detail if i % 2 else "/api/cinema/movie_sessions/"
+        status, elapsed = call_wsgi(application, "GET", path, cookie)
+        return "read", elapsed, status.startswith("200")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(call, range(1, args.requests + 1)))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "vendor": connection.vendor,
+        "requests_per_second": round(len(results) / elapsed, 1),
+    }
+    for kind in ("read", "write"):
+        latencies = sorted(
+            latency * 1000 for result, latency, _ in results if result == kind
+        )
+        report[kind] = {
+            "p50_ms": round(percentile(latencies, 0.5), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "errors": sum(
+                not ok for result, _, ok in results if result == kind
+            ),
+        }
+    return report
+
+
+def run_profile(profile: str, args) -> dict | None:
+    env = {**os.environ, **PROFILES[profile]}
+    if profile == "postgres-pool":
+        env["POSTGRES_POOL_MAX_SIZE"] = str(args.concurrency)
+    stem, extension = os.path.splitext(args.database)
+    command = [
+        sys.executable, "-m", "benchmarks.throughput", "--worker",
+        "--database", f"{stem}-{profile}{extension}",
+        "--requests", str(args.requests),
+        "--concurrency", str(args.concurrency),
+        "--write-every", str(args.write_every),
+    ]
+    finished = subprocess.run(
+        command, cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if finished.returncode:
+        print(f"{profile}: failed\n{finished.stderr.strip()[-2000:]}")
+        return None
+    return json.loads(finished.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default="benchmark_throughput.sqlite3")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-every", type=int, default=10)
+    parser.add_argument(
+        "--profile",
+        action="append",
+        choices=PROFILES,
+        help="Profiles to compare; dev and sqlite by default.",
+    )
+    parser.add_argument(
+        "--worker", action="store_true", help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args)))
+        return
+
+    print(
+        f"{'profile':14} {'req/s':>8} {'read p50':>9} {'read p99':>9} "
+        f"{'write p50':>10} {'write p99':>10} {'errors':>7}"
+    )
+    for profile in args.profile or ["dev", "sqlite"]:
+        report = run_profile(profile, args)
+        if report is None:
+            continue
+        print(
+            f"{profile:14} {report['requests_per_second']:8.0f} "
+            f"{report['read']['p50_ms']:9.1f} {report['read']['p99_ms']:9.1f} "
+            f"{report['write']['p50_ms']:10.1f} "
+            f"{report['write']['p99_ms']:10.1f} "
+            f"{report['read']['errors'] + report['write']['errors']:7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
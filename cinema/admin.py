@@ -6,6 +6,7 @@ from .models import (
     Actor,
     Movie,
     MovieSession,
+    SeatHold,
     Order,
     Ticket,
 )
@@ -15,5 +16,6 @@ admin.site.register(Genre)
 admin.site.register(Actor)
 admin.site.register(Movie)
 admin.site.register(MovieSession)
+admin.site.register(SeatHold)
 admin.site.register(Order)
 admin.site.register(Ticket)
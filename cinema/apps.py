@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CinemaConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cinema"
+
+    def ready(self) -> None:
+        from cinema import signals  # noqa: F401
+        from cinema.metrics import instrument
+
+        instrument()
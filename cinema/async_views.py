@@ -0,0 +1,194 @@
+"""Async read endpoints for movie sessions, served natively under ASGI.
+
+They return the same JSON as ``MovieSessionViewSet.list`` and
+``retrieve`` but use the async ORM and cache API instead of DRF's sync
+request cycle, so seat-map polling does not occupy a worker thread.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import serializers, status
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from cinema.day_schedule import aget_day_schedule
+from cinema.filters import parse_date
+from cinema.flat_serializers import (
+    FlatMovieListSerializer,
+    FlatMovieSessionListSerializer,
+)
+from cinema.models import Movie, MovieSession
+from cinema.pagination import MovieSessionPagination
+from cinema.seat_events import get_seat_event_broker
+from cinema.seat_map import aget_seat_map
+from cinema.serializers import CinemaHallSerializer
+
+_show_time = serializers.DateTimeField().to_representation
+
+# a comment line keeps idle seat event streams open through proxies
+KEEPALIVE_SECONDS = 15
+
+
+def _authenticate(request):
+    # the authenticators DRF views use, e.g. sessions and Basic auth
+    return Request(
+        request,
+        authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    ).user
+
+
+async def _authenticated(request) -> bool:
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except AuthenticationFailed:
+        return False
+    return user.is_authenticated
+
+
+def _not_authenticated() -> JsonResponse:
+    return JsonResponse(
+        {"detail": "Authentication credentials were not provided."},
+        status=status.HTTP_403_FORBIDDEN,
+    )
+
+
+@require_GET
+async def movie_session_list(request):
+    if not await _authenticated(request):
+        return _not_authenticated()
+
+    queryset = MovieSession.objects.with_tickets_available()
+    paginator = MovieSessionPagination()
+    try:
+        movie = request.GET.get("movie")
+        if movie:
+            movie = int(movie)
+            queryset = queryset.filter(movie_id=movie)
+        if date := request.GET.get("date"):
+            # the home page query, served from the day's cached schedule
+            rows = await aget_day_schedule(parse_date(date, "date"))
+            if movie:
+                rows = [row for row in rows if row["movie"] == movie]
+            rows = paginator.paginate_rows(rows, Request(request))
+        else:
+            rows = await paginator.apaginate_queryset(
+                FlatMovieSessionListSerializer.values(queryset),
+                Request(request),
+            )
+        if movie and not rows:
+            # the sync list's filter rejects unknown movies
+            if not await Movie.objects.filter(pk=movie).aexists():
+                raise ValueError(movie)
+    except ValueError:
+        return JsonResponse(
+            {"movie": ["Select a valid choice."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    except ValidationError as error:
+        return JsonResponse(error.detail, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(
+        paginator.get_paginated_data(FlatMovieSessionListSerializer(rows).data)
+    )
+
+
+async def _get_movie_session(pk: int) -> MovieSession | None:
+    try:
+        return await MovieSession.objects.select_related(
+            "cinema_hall"
+        ).aget(pk=pk)
+    except MovieSession.DoesNotExist:
+        return None
+
+
+def _not_found() -> JsonResponse:
+    return JsonResponse(
+        {"detail": "No MovieSession matches the given query."},
+        status=status.HTTP_404_NOT_FOUND,
+    )
+
+
+@require_GET
+async def movie_session_detail(request, pk: int):
+    if not await _authenticated(request):
+        return _not_authenticated()
+
+    movie_session = await _get_movie_session(pk)
+    if movie_session is None:
+        return _not_found()
+    movies = FlatMovieListSerializer.values(
+        Movie.objects.with_names().filter(pk=movie_session.movie_id)
+    )
+    seat_map = await aget_seat_map(movie_session)
+    layout = movie_session.cinema_hall.seat_layout
+    data = {
+        "id": movie_session.id,
+        "show_time": _show_time(movie_session.show_time),
+        "movie": FlatMovieListSerializer([await movies.aget()]).data[0],
+        "cinema_hall": CinemaHallSerializer(movie_session.cinema_hall).data,
+        "taken_places": seat_map.taken_places(),
+        "seats_available": layout.seats_available(seat_map.bits),
+    }
+    if request.GET.get("seat_map") == "bitmap":
+        data["seat_map"] = seat_map.packed()
+    return JsonResponse(data)
+
+
+def _server_sent_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _seat_events(movie_session):
+    # subscribe before the snapshot so no change falls between the two
+    async with get_seat_event_broker().subscribe(movie_session.id) as events:
+        seat_map = await aget_seat_map(movie_session)
+        yield _server_sent_event(
+            "snapshot", {"taken_places": seat_map.taken_places()}
+        )
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    events.get(), KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event.get("reset"):
+                # the watcher fell behind, send the whole map again
+                seat_map = await aget_seat_map(movie_session)
+                yield _server_sent_event(
+                    "snapshot", {"taken_places": seat_map.taken_places()}
+                )
+            else:
+                yield _server_sent_event("seats", event)
+
+
+@require_GET
+async def movie_session_seat_events(request, pk: int):
+    """Stream a snapshot of taken places, then taken/released deltas."""
+    if not isinstance(request, ASGIRequest):
+        # a WSGI server collects the whole endless stream before sending
+        return JsonResponse(
+            {"detail": "Seat events are only served under ASGI."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+    if not await _authenticated(request):
+        return _not_authenticated()
+
+    movie_session = await _get_movie_session(pk)
+    if movie_session is None:
+        return _not_found()
+    response = StreamingHttpResponse(
+        _seat_events(movie_session), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,336 @@
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from cinema.caching import bump_version
+from cinema.day_schedule import invalidate_day_schedule
+from cinema.models import MovieSession, Order, SeatHold, Ticket
+from cinema.seat_events import publish_seat_changes
+from cinema.seat_map import find_best_seats, invalidate_seat_map, read_seat_map
+
+# SQLite has no row locks, so bookings of this process are serialized here
+_sqlite_write_lock = threading.Lock()
+
+
+class SeatsConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the requested seats are already taken."
+    default_code = "seats_conflict"
+
+    def __init__(self, conflicts) -> None:
+        super().__init__()
+        self.detail = {
+            "detail": self.default_detail,
+            "conflicts": [
+                {"movie_session": movie_session, "row": row, "seat": seat}
+                for movie_session, row, seat in conflicts
+            ],
+        }
+
+
+class SeatsUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "No row has that many adjacent free seats."
+    default_code = "seats_unavailable"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = (
+        "This Idempotency-Key was already used with a different request."
+    )
+    default_code = "idempotency_key_reused"
+
+
+@contextmanager
+def locked_movie_sessions(movie_session_ids):
+    if connection.vendor == "sqlite":
+        with _sqlite_write_lock, transaction.atomic():
+            yield
+        return
+    with transaction.atomic():
+        # lock in a stable order so concurrent orders cannot deadlock
+        list(
+            MovieSession.objects.select_for_update()
+            .filter(id__in=movie_session_ids)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        yield
+
+
+def _same_places(queryset, places):
+    return queryset.filter(
+        movie_session__in={place[0] for place in places},
+        row__in={place[1] for place in places},
+        seat__in={place[2] for place in places},
+    )
+
+
+def find_taken_places(places, user=None) -> list[tuple]:
+    """Return the places booked or held by someone other than ``user``."""
+    taken = set(
+        _same_places(Ticket.objects, places).values_list(
+            "movie_session", "row", "seat"
+        )
+    )
+    taken.update(
+        _same_places(SeatHold.objects.active(), places)
+        .exclude(user=user)
+        .values_list("movie_session", "row", "seat")
+    )
+    return [place for place in places if place in taken]
+
+
+def _release_holds(places) -> None:
+    places = set(places)
+    hold_ids = [
+        hold_id
+        for hold_id, *place in _same_places(
+            SeatHold.objects, places
+        ).values_list("id", "movie_session", "row", "seat")
+        if tuple(place) in places
+    ]
+    if hold_ids:
+        SeatHold.objects.filter(id__in=hold_ids).delete()
+
+
+def book_tickets(user, tickets_data, **order_data) -> Order:
+    places = [
+        (ticket_data["movie_session"].id, ticket_data["row"],
+         ticket_data["seat"])
+        for ticket_data in tickets_data
+    ]
+    movie_session_ids = sorted({place[0] for place in places})
+    try:
+        with locked_movie_sessions(movie_session_ids):
+            conflicts = find_taken_places(places, user)
+            if conflicts:
+                raise SeatsConflict(conflicts)
+            # the user's own holds (and stale ones) turn into tickets
+            _release_holds(places)
+            order = Order.objects.create(user=user, **order_data)
+            Ticket.objects.bulk_create(
+                Ticket(order=order, **ticket_data)
+                for ticket_data in tickets_data
+            )
+            taken = defaultdict(list)
+            for movie_session_id, row, seat in places:
+                taken[movie_session_id].append((row, seat))
+            add_tickets_sold_to_many(
+                {
+                    movie_session_id: len(session_places)
+                    for movie_session_id, session_places in taken.items()
+                }
+            )
+            for movie_session_id, session_places in taken.items():
+                invalidate_seat_map(movie_session_id)
+                publish_seat_changes(movie_session_id, taken=session_places)
+            invalidate_day_schedule(
+                *{
+                    ticket_data["movie_session"].show_time
+                    for ticket_data in tickets_data
+                }
+            )
+    except IntegrityError:
+        # a booking from another process won the race for these seats
+        raise SeatsConflict(find_taken_places(places, user))
+    return order
+
+
+def request_fingerprint(data) -> str:
+    return hashlib.sha256(
+        json.dumps(
+            data, sort_keys=True, separators=(",", ":"), default=str
+        ).encode()
+    ).hexdigest()
+
+
+def find_idempotent_order(user, key: str, fingerprint: str) -> Order | None:
+    """Return the order ``user`` already created with ``key``, if any."""
+    order = Order.objects.filter(user=user, idempotency_key=key).first()
+    if order is not None and order.request_fingerprint != fingerprint:
+        raise IdempotencyKeyReused()
+    return order
+
+
+def expire_idempotency_keys(batch_size: int = 1000) -> int:
+    """Forget the keys of orders older than ``IDEMPOTENCY_KEY_TTL_SECONDS``.
+
+    The orders stay; a request repeating an expired key books again.
+    """
+    expired_before = timezone.now() - timedelta(
+        seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+    )
+    expired = 0
+    while True:
+        order_ids = list(
+            Order.objects.filter(
+                idempotency_key__isnull=False, created_at__lt=expired_before
+            )
+            .order_by("created_at")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return expired
+        expired += Order.objects.filter(id__in=order_ids).update(
+            idempotency_key=None, request_fingerprint=""
+        )
+
+
+def add_tickets_sold(movie_session_id: int, count: int) -> None:
+    MovieSession.objects.filter(id=movie_session_id).update(
+        tickets_sold=F("tickets_sold") + count
+    )
+
+
+def add_tickets_sold_to_many(counts: dict[int, int]) -> None:
+    """Add ``counts`` (movie session id to tickets) in one statement."""
+    if len(counts) == 1:
+        add_tickets_sold(*next(iter(counts.items())))
+        return
+    MovieSession.objects.filter(id__in=counts).update(
+        tickets_sold=F("tickets_sold") + Case(
+            *(
+                When(id=movie_session_id, then=Value(count))
+                for movie_session_id, count in counts.items()
+            ),
+            default=Value(0),
+        )
+    )
+
+
+def reconcile_tickets_sold(batch_size: int = 1000, fix: bool = True):
+    """Yield ``(id, tickets_sold, actual)`` for every drifted session.
+
+    Sessions are scanned in id batches; with ``fix`` the drifted ones are
+    recounted under the booking lock and corrected.
+    """
+    last_id = 0
+    while True:
+        batch = list(
+            MovieSession.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .annotate(actual=Count("tickets"))
+            .values_list("id", "tickets_sold", "actual")[:batch_size]
+        )
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        drifted = [row for row in batch if row[1] != row[2]]
+        if drifted and fix:
+            drifted_ids = [row[0] for row in drifted]
+            with locked_movie_sessions(drifted_ids):
+                for movie_session_id, actual in (
+                    MovieSession.objects.filter(id__in=drifted_ids)
+                    .annotate(actual=Count("tickets"))
+                    .values_list("id", "actual")
+                ):
+                    MovieSession.objects.filter(id=movie_session_id).update(
+                        tickets_sold=actual
+                    )
+            # corrected availability may be cached in any day's schedule
+            bump_version(MovieSession)
+        yield from drifted
+
+
+def hold_seats(user, movie_session, seats) -> list[SeatHold]:
+    places = [
+        (movie_session.id, seat_data["row"], seat_data["seat"])
+        for seat_data in seats
+    ]
+    try:
+        with locked_movie_sessions([movie_session.id]):
+            conflicts = find_taken_places(places, user)
+            if conflicts:
+                raise SeatsConflict(conflicts)
+            return _hold(user, movie_session, places)
+    except IntegrityError:
+        raise SeatsConflict(find_taken_places(places, user))
+
+
+def hold_best_seats(user, movie_session, count: int) -> list[SeatHold]:
+    """Hold the ``count`` best adjacent free seats in one transaction.
+
+    The seat map is read under the booking lock instead of from the
+    cache, so the chosen seats cannot be taken before they are held.
+    """
+    with locked_movie_sessions([movie_session.id]):
+        seat_map, _ = read_seat_map(movie_session)
+        seats = find_best_seats(
+            seat_map, count, movie_session.cinema_hall.seat_layout.blocked
+        )
+        if not seats:
+            raise SeatsUnavailable()
+        return _hold(
+            user,
+            movie_session,
+            [(movie_session.id, row, seat) for row, seat in seats],
+        )
+
+
+def _hold(user, movie_session, places) -> list[SeatHold]:
+    """Hold free ``places``; the caller holds the booking lock."""
+    expires_at = timezone.now() + timedelta(
+        seconds=settings.SEAT_HOLD_TTL_SECONDS
+    )
+    # holding a seat again extends the user's existing hold
+    _release_holds(places)
+    holds = SeatHold.objects.bulk_create(
+        SeatHold(
+            movie_session=movie_session,
+            user=user,
+            row=row,
+            seat=seat,
+            expires_at=expires_at,
+        )
+        for _, row, seat in places
+    )
+    invalidate_seat_map(movie_session.id)
+    invalidate_day_schedule(movie_session.show_time)
+    publish_seat_changes(
+        movie_session.id, taken=[(row, seat) for _, row, seat in places]
+    )
+    return holds
+
+
+def release_seat_holds(user, movie_session) -> int:
+    holds = SeatHold.objects.filter(user=user, movie_session=movie_session)
+    released = list(holds.values_list("row", "seat"))
+    deleted, _ = holds.delete()
+    if deleted:
+        invalidate_seat_map(movie_session.id)
+        invalidate_day_schedule(movie_session.show_time)
+        publish_seat_changes(movie_session.id, released=released)
+    return deleted
+
+
+def delete_expired_holds(batch_size: int = 1000) -> int:
+    deleted = 0
+    while True:
+        # expires_at is indexed, so every batch is a range scan
+        holds = list(
+            SeatHold.objects.expired()
+            .order_by("expires_at")
+            .values_list("id", "movie_session", "row", "seat")[:batch_size]
+        )
+        if not holds:
+            return deleted
+        deleted += SeatHold.objects.filter(
+            id__in=[hold[0] for hold in holds]
+        ).delete()[0]
+        released = defaultdict(list)
+        for _, movie_session_id, row, seat in holds:
+            released[movie_session_id].append((row, seat))
+        for movie_session_id, places in released.items():
+            publish_seat_changes(movie_session_id, released=places)
@@ -0,0 +1,130 @@
+import hashlib
+import math
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "cinema:version:{}"
+MODIFIED_KEY = "cinema:modified:{}"
+RESPONSE_KEY = "cinema:response:{}"
+
+
+def _bump(label: str) -> None:
+    key = VERSION_KEY.format(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # a fresh counter must not reuse versions of evicted entries
+        cache.add(key, time.time_ns(), None)
+        cache.incr(key)
+    cache.set(MODIFIED_KEY.format(label), time.time(), None)
+
+
+def bump_version(model) -> None:
+    """Invalidate every cached response that depends on ``model``."""
+    label = model._meta.label_lower
+    _bump(label)
+    # readers may cache what they saw before this transaction committed
+    transaction.on_commit(lambda: _bump(label))
+
+
+def get_versions(models) -> list[tuple[str, int, float]] | None:
+    """Return ``(label, version, modified)`` per model.
+
+    ``None`` means the cache does not keep values (e.g. ``DummyCache``).
+    """
+    labels = [model._meta.label_lower for model in models]
+    keys = [VERSION_KEY.format(label) for label in labels] + [
+        MODIFIED_KEY.format(label) for label in labels
+    ]
+    for _ in range(2):
+        values = cache.get_many(keys)
+        missing = [
+            label
+            for label in labels
+            if VERSION_KEY.format(label) not in values
+            or MODIFIED_KEY.format(label) not in values
+        ]
+        if not missing:
+            return [
+                (
+                    label,
+                    values[VERSION_KEY.format(label)],
+                    values[MODIFIED_KEY.format(label)],
+                )
+                for label in labels
+            ]
+        for label in missing:
+            _bump(label)
+    return None
+
+
+class CachedResponseMixin:
+    """Serve ``list``/``retrieve`` from the cache with conditional GETs.
+
+    Cached responses are keyed by the request path and the versions of
+    ``cache_models``, which signals bump whenever one of them changes, so
+    nothing has to be deleted on writes.
+    """
+
+    cache_models = ()
+    cache_timeout = 60 * 60
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versions = get_versions(self.cache_models)
+        if versions is None:
+            return handler(request, *args, **kwargs)
+        etag_source = "|".join(
+            [request.get_full_path()]
+            + [f"{label}:{version}" for label, version, _ in versions]
+        )
+        etag = f'"{hashlib.md5(etag_source.encode()).hexdigest()}"'
+        # rounded up, so a change later in the same second is never
+        # reported as older than a client's copy
+        last_modified = math.ceil(max(modified for _, _, modified in versions))
+        headers = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+
+        if self.is_not_modified(request, etag, last_modified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+
+        key = RESPONSE_KEY.format(etag.strip('"'))
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, self.cache_timeout)
+        else:
+            response = Response(data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag: str, last_modified: int) -> bool:
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in [
+                tag.strip().removeprefix("W/")
+                for tag in if_none_match.split(",")
+            ]
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return (
+            if_modified_since is not None
+            and last_modified <= if_modified_since
+        )
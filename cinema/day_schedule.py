@@ -0,0 +1,127 @@
+"""Cached per-day schedules for the ``?date=`` session lists.
+
+The rows of one day's sessions, as ``FlatMovieSessionListSerializer``
+reads them, are built with one query and cached under the day together
+with the ``Movie``, ``CinemaHall`` and ``MovieSession`` cache versions
+they were built from. A lookup reads the day and the versions with one
+``get_many``, so a warm ``?date=`` (or ``?date=&movie=``) list runs no
+query at all.
+
+Booking, holds and session edits delete only the days they touch;
+renaming a movie or hall, or a bulk import, bumps a version instead and
+so retires every day at once. A day holding seat holds expires with its
+earliest hold, the moment its availability would change by itself.
+"""
+
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from cinema.caching import VERSION_KEY, get_versions
+from cinema.flat_serializers import FlatMovieSessionListSerializer
+from cinema.models import CinemaHall, Movie, MovieSession, SeatHold
+
+CACHE_KEY = "cinema:day_schedule:{}"
+CACHE_TIMEOUT = 60 * 60
+SCHEDULE_MODELS = (Movie, CinemaHall, MovieSession)
+
+_version_keys = [
+    VERSION_KEY.format(model._meta.label_lower) for model in SCHEDULE_MODELS
+]
+
+
+def show_date(show_time: datetime.datetime) -> datetime.date:
+    if timezone.is_aware(show_time):
+        show_time = timezone.localtime(show_time)
+    return show_time.date()
+
+
+def _day_queryset(day: datetime.date):
+    earliest_hold = (
+        SeatHold.objects.active()
+        .filter(movie_session=OuterRef("pk"))
+        .order_by("expires_at")
+        .values("expires_at")[:1]
+    )
+    queryset = (
+        MovieSession.objects.with_tickets_available()
+        .annotate(earliest_hold=Subquery(earliest_hold))
+        .filter(
+            show_time__gte=day,
+            show_time__lt=day + datetime.timedelta(days=1),
+        )
+        .order_by("-show_time", "-id")
+    )
+    return FlatMovieSessionListSerializer.values(
+        queryset, "movie", "earliest_hold"
+    )
+
+
+def _schedule(rows) -> tuple[list[dict], int]:
+    timeout = CACHE_TIMEOUT
+    for row in rows:
+        earliest_hold = row.pop("earliest_hold")
+        if earliest_hold is not None:
+            expires_in = (earliest_hold - timezone.now()).total_seconds()
+            timeout = max(1, min(timeout, int(expires_in)))
+    return rows, timeout
+
+
+def _cached(key: str, values: dict):
+    """Return the cached rows, if current, and the current versions."""
+    versions = [values.get(version_key) for version_key in _version_keys]
+    if None in versions:
+        return None, None
+    cached = values.get(key)
+    if cached is not None and cached[0] == versions:
+        return cached[1], versions
+    return None, versions
+
+
+def get_day_schedule(day: datetime.date) -> list[dict]:
+    """The day's session rows, newest first, as the list endpoint sorts."""
+    key = CACHE_KEY.format(day.isoformat())
+    rows, versions = _cached(key, cache.get_many([key, *_version_keys]))
+    if rows is not None:
+        return rows
+    if versions is None:
+        current = get_versions(SCHEDULE_MODELS)
+        if current is None:
+            return _schedule(list(_day_queryset(day)))[0]
+        versions = [version for _, version, _ in current]
+    rows, timeout = _schedule(list(_day_queryset(day)))
+    cache.set(key, (versions, rows), timeout)
+    return rows
+
+
+async def aget_day_schedule(day: datetime.date) -> list[dict]:
+    key = CACHE_KEY.format(day.isoformat())
+    rows, versions = _cached(
+        key, await cache.aget_many([key, *_version_keys])
+    )
+    if rows is not None:
+        return rows
+    if versions is None:
+        current = await sync_to_async(get_versions)(SCHEDULE_MODELS)
+        if current is None:
+            return _schedule([row async for row in _day_queryset(day)])[0]
+        versions = [version for _, version, _ in current]
+    rows, timeout = _schedule([row async for row in _day_queryset(day)])
+    await cache.aset(key, (versions, rows), timeout)
+    return rows
+
+
+def invalidate_day_schedule(*show_times) -> None:
+    keys = {
+        CACHE_KEY.format(show_date(show_time).isoformat())
+        for show_time in show_times
+        if show_time is not None
+    }
+    if keys:
+        cache.delete_many(keys)
+        # a reader may rebuild the day before this transaction is committed
+        transaction.on_commit(lambda: cache.delete_many(keys))
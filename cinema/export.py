@@ -0,0 +1,81 @@
+"""Flat export of every ticket with its order, session, movie and hall.
+
+Rows come from a single ``values_list`` join read through
+``iterator()``, and the renderers yield one line at a time, so memory
+stays constant however many tickets are exported.
+"""
+
+import csv
+import datetime
+import json
+
+from cinema.models import Ticket
+
+COLUMNS = (
+    ("order_id", "order_id"),
+    ("order_created_at", "order__created_at"),
+    ("user_id", "order__user_id"),
+    ("ticket_id", "id"),
+    ("row", "row"),
+    ("seat", "seat"),
+    ("movie_session_id", "movie_session_id"),
+    ("show_time", "movie_session__show_time"),
+    ("movie_id", "movie_session__movie_id"),
+    ("movie_title", "movie_session__movie__title"),
+    ("cinema_hall_id", "movie_session__cinema_hall_id"),
+    ("cinema_hall_name", "movie_session__cinema_hall__name"),
+)
+HEADER = [name for name, _ in COLUMNS]
+
+
+def ticket_rows(
+    created_after: datetime.date | None = None,
+    created_before: datetime.date | None = None,
+    chunk_size: int = 2000,
+):
+    """Yield ticket rows of orders created within the inclusive date range."""
+    queryset = Ticket.objects.all()
+    if created_after is not None:
+        queryset = queryset.filter(order__created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(
+            order__created_at__lt=created_before + datetime.timedelta(days=1)
+        )
+    return (
+        queryset.order_by("order_id", "id")
+        .values_list(*(lookup for _, lookup in COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+class _Line:
+    """File-like target that hands back what ``csv.writer`` writes."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow([_value(value) for value in row])
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(HEADER, (_value(value) for value in row)))
+        ) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+}
@@ -0,0 +1,28 @@
+from django.db.models import JSONField, Subquery
+
+
+class JSONArraySubquery(Subquery):
+    """JSON array of the ``item`` column of ``queryset``, in its order.
+
+    The queryset is aggregated from a derived table, so ordering works on
+    every backend and an empty queryset gives ``[]`` rather than ``NULL``.
+    """
+
+    template = (
+        "(SELECT %(function)s FROM (%(subquery)s) json_array_items)"
+    )
+    output_field = JSONField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        extra_context.setdefault("function", "JSON_GROUP_ARRAY(item)")
+        return super().as_sql(compiler, connection, **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # Django has psycopg return jsonb as text for JSONField to load,
+        # but json comes back already decoded
+        return self.as_sql(
+            compiler,
+            connection,
+            function="COALESCE(JSONB_AGG(item), '[]'::jsonb)",
+            **extra_context,
+        )
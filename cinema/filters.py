@@ -0,0 +1,45 @@
+import datetime
+
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from cinema.search import get_search_backend
+
+
+class MovieSearchFilter(filters.SearchFilter):
+    """``?search=`` served by the configured full-text search backend."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_backend(queryset.db).search(queryset, terms)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.search_description),
+                "schema": {"type": "string"},
+            }
+        ]
+
+
+def parse_date(value: str, param: str) -> datetime.date:
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError(
+            {param: "Date has wrong format. Use YYYY-MM-DD."}
+        )
+
+
+def filter_by_show_date(queryset, date: str):
+    day = parse_date(date, "date")
+    # a range on the bare column can use the show_time indexes
+    return queryset.filter(
+        show_time__gte=day,
+        show_time__lt=day + datetime.timedelta(days=1),
+    )
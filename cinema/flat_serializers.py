@@ -0,0 +1,77 @@
+from operator import itemgetter
+
+from rest_framework import serializers
+
+from cinema.metrics import timed_serializer_data
+
+_show_time = serializers.DateTimeField().to_representation
+
+
+class FlatListSerializer:
+    """Read-only list serializer over rows from ``QuerySet.values()``.
+
+    ``fields`` holds ``(name, lookup, to_representation)`` triples; the
+    lookups are read with one precomputed ``itemgetter`` and only fields
+    with a ``to_representation`` are converted, so a row costs a tuple
+    unpack and a ``dict(zip())`` instead of a DRF field walk.
+    """
+
+    fields = ()
+
+    def __init__(self, instance=None, many=True, **kwargs) -> None:
+        self.instance = instance
+        self.context = kwargs.get("context", {})
+
+    @classmethod
+    def values(cls, queryset, *extra):
+        return queryset.values(
+            *(lookup for _, lookup, _ in cls.fields), *extra
+        )
+
+    @property
+    @timed_serializer_data
+    def data(self) -> list[dict]:
+        names = [name for name, _, _ in self.fields]
+        getter = itemgetter(*(lookup for _, lookup, _ in self.fields))
+        converters = [
+            (index, to_representation)
+            for index, (_, _, to_representation) in enumerate(self.fields)
+            if to_representation is not None
+        ]
+        data = []
+        for row in self.instance:
+            values = list(getter(row))
+            for index, to_representation in converters:
+                if values[index] is not None:
+                    values[index] = to_representation(values[index])
+            data.append(dict(zip(names, values)))
+        return data
+
+
+class FlatMovieSessionListSerializer(FlatListSerializer):
+    """Same output as ``MovieSessionListSerializer``."""
+
+    fields = (
+        ("id", "id", None),
+        ("show_time", "show_time", _show_time),
+        ("movie_title", "movie__title", None),
+        ("cinema_hall_name", "cinema_hall__name", None),
+        ("cinema_hall_capacity", "cinema_hall_capacity", None),
+        ("tickets_available", "tickets_available", None),
+    )
+
+
+class FlatMovieListSerializer(FlatListSerializer):
+    """Same output as ``MovieListSerializer``.
+
+    Expects a queryset annotated by ``MovieQuerySet.with_names()``.
+    """
+
+    fields = (
+        ("id", "id", None),
+        ("title", "title", None),
+        ("description", "description", None),
+        ("duration", "duration", None),
+        ("genres", "genre_names", None),
+        ("actors", "actor_names", None),
+    )
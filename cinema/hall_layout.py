@@ -0,0 +1,83 @@
+"""Seat layouts of cinema halls.
+
+A layout holds one string per row with one character per seat: ``S`` is
+a standard seat, ``V`` a VIP seat and ``.`` a place without a seat for
+sale (an aisle or a blocked seat). An empty layout means every seat of
+the hall is standard. Parsed layouts are kept in process memory, keyed by
+their content, so checking a seat against a loaded hall costs no query
+and an edited layout can never be served stale.
+"""
+
+import functools
+
+STANDARD = "S"
+VIP = "V"
+BLOCKED = "."
+SEAT_CATEGORIES = {STANDARD: "standard", VIP: "vip"}
+
+
+class HallLayout:
+    def __init__(self, rows: int, seats_in_row: int, layout=()) -> None:
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        self.row_codes = tuple(layout) or (STANDARD * seats_in_row,) * rows
+        codes = "".join(self.row_codes)
+        self.capacity = len(codes) - codes.count(BLOCKED)
+        self.category_counts = {
+            name: codes.count(code) for code, name in SEAT_CATEGORIES.items()
+        }
+        # same bit order as SeatMap, so the two can be combined
+        padding = "0" * (-len(codes) % 8)
+
+        def mask(wanted: str) -> int:
+            bits = "".join("1" if code == wanted else "0" for code in codes)
+            return int(bits + padding or "0", 2)
+
+        self.blocked = mask(BLOCKED).to_bytes(
+            (len(codes) + len(padding)) // 8, "big"
+        )
+        self.category_masks = {
+            name: mask(code) for code, name in SEAT_CATEGORIES.items()
+        }
+
+    def seats_available(self, taken: bytes) -> dict[str, int]:
+        """Count the free seats per category, given a SeatMap's bits."""
+        taken = int.from_bytes(taken, "big")
+        return {
+            name: (mask & ~taken).bit_count()
+            for name, mask in self.category_masks.items()
+        }
+
+    def category(self, row: int, seat: int) -> str | None:
+        """Return the category of a seat; ``None`` if it is not for sale."""
+        if not (1 <= row <= self.rows and 1 <= seat <= self.seats_in_row):
+            return None
+        return SEAT_CATEGORIES.get(self.row_codes[row - 1][seat - 1])
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_layout(rows: int, seats_in_row: int, layout: tuple) -> HallLayout:
+    return HallLayout(rows, seats_in_row, layout)
+
+
+def get_hall_layout(rows: int, seats_in_row: int, layout) -> HallLayout:
+    return _parse_layout(rows, seats_in_row, tuple(layout or ()))
+
+
+def layout_error(rows: int, seats_in_row: int, layout) -> str | None:
+    """Describe what makes ``layout`` invalid for the hall, if anything."""
+    if not layout:
+        return None
+    if not isinstance(layout, list) or not all(
+        isinstance(row, str) for row in layout
+    ):
+        return "Layout must be a list of row strings."
+    if len(layout) != rows:
+        return f"Layout must have {rows} rows, not {len(layout)}."
+    codes = "".join(SEAT_CATEGORIES) + BLOCKED
+    for number, row in enumerate(layout, start=1):
+        if len(row) != seats_in_row:
+            return f"Row {number} must have {seats_in_row} seats."
+        if not set(row) <= set(codes):
+            return f"Row {number} may only contain {', '.join(codes)}."
+    return None
@@ -0,0 +1,294 @@
+"""Bulk import of catalogue and booking data from streamed fixtures.
+
+``loaddata`` saves objects one at a time (and ``Ticket.save`` runs
+``full_clean`` for each of them). The importer instead reads objects in
+the fixture format lazily, buffers them per model and writes every batch
+with ``bulk_create`` in one transaction: many-to-many links become bulk
+through-table inserts and ticket seats are checked against their halls
+with one query per batch. The number of committed objects is reported
+after every batch, so an interrupted import can resume from there.
+"""
+
+import csv
+import json
+import re
+from datetime import timedelta
+
+from django.apps import apps
+from django.core import serializers
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, models, transaction
+from django.utils import timezone
+
+from cinema.booking import reconcile_tickets_sold
+from cinema.caching import bump_version
+from cinema.hall_layout import get_hall_layout
+from cinema.models import Actor, CinemaHall, Genre, Movie, MovieSession, Ticket
+from cinema.search import get_search_backend, movie_documents
+from cinema.seat_map import invalidate_seat_map
+
+CATALOGUE_MODELS = (Genre, Actor, CinemaHall, Movie)
+# separates many-to-many primary keys inside a CSV cell
+CSV_MANY_SEPARATOR = "|"
+
+_separators = re.compile(r"[\s,]*")
+
+
+def json_array_objects(stream, chunk_size: int = 1 << 16):
+    """Yield the items of a top-level JSON array without reading it whole."""
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array of objects.")
+    index = 1
+    while True:
+        index = _separators.match(buffer, index).end()
+        if index < len(buffer) and buffer[index] == "]":
+            return
+        try:
+            if index == len(buffer):
+                raise json.JSONDecodeError("Unterminated array", buffer, 0)
+            item, index = decoder.raw_decode(buffer, index)
+        except json.JSONDecodeError:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, index = buffer[index:] + chunk, 0
+            continue
+        yield item
+        if index > chunk_size:
+            buffer, index = buffer[index:], 0
+
+
+def json_lines_objects(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def csv_objects(stream, model_label: str):
+    """Yield fixture objects of ``model_label`` from CSV rows.
+
+    The header names the model fields plus ``id`` (or ``pk``);
+    many-to-many cells hold primary keys separated by ``|``.
+    """
+    model = apps.get_model(model_label)
+    many_to_many = {field.name for field in model._meta.many_to_many}
+    for row in csv.DictReader(stream):
+        pk = row.pop("pk", None) or row.pop("id", None)
+        fields = {
+            name: (
+                [key for key in value.split(CSV_MANY_SEPARATOR) if key]
+                if name in many_to_many
+                else value
+            )
+            for name, value in row.items()
+        }
+        yield {"model": model_label, "pk": pk, "fields": fields}
+
+
+def read_objects(stream, name: str, model_label: str | None = None):
+    """Pick the reader for ``name`` by its extension."""
+    if name.endswith(".csv"):
+        if not model_label:
+            raise ValueError(
+                "CSV input needs a model label, e.g. cinema.ticket."
+            )
+        return csv_objects(stream, model_label)
+    if name.endswith((".jsonl", ".ndjson")):
+        return json_lines_objects(stream)
+    return json_array_objects(stream)
+
+
+def validate_tickets(tickets) -> None:
+    """Check the seats of a batch of tickets with a single query."""
+    layouts = {
+        movie_session_id: get_hall_layout(rows, seats_in_row, layout)
+        for movie_session_id, rows, seats_in_row, layout in (
+            MovieSession.objects.filter(
+                id__in={ticket.movie_session_id for ticket in tickets}
+            ).values_list(
+                "id",
+                "cinema_hall__rows",
+                "cinema_hall__seats_in_row",
+                "cinema_hall__layout",
+            )
+        )
+    }
+    errors = []
+    for ticket in tickets:
+        layout = layouts.get(ticket.movie_session_id)
+        if layout is None or layout.category(ticket.row, ticket.seat) is None:
+            errors.append(
+                f"Ticket {ticket.pk}: seat ({ticket.row}, {ticket.seat}) "
+                f"is not in movie session {ticket.movie_session_id}"
+            )
+    if errors:
+        if len(errors) > 10:
+            errors[10:] = [f"... and {len(errors) - 10} more"]
+        raise ValidationError(errors)
+
+
+def make_datetimes_naive(model, instances) -> None:
+    """Drop fixture offsets the way ``save`` would when ``USE_TZ`` is off."""
+    attnames = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.DateTimeField)
+    ]
+    for instance in instances:
+        for attname in attnames:
+            value = getattr(instance, attname)
+            if value is not None and timezone.is_aware(value):
+                setattr(instance, attname, timezone.make_naive(value))
+
+
+def set_end_times(movie_sessions) -> None:
+    """Do what the ``MovieSession`` pre_save signal does, one query a batch."""
+    durations = dict(
+        Movie.objects.filter(
+            id__in={session.movie_id for session in movie_sessions}
+        ).values_list("id", "duration")
+    )
+    for session in movie_sessions:
+        session.end_time = session.show_time + timedelta(
+            minutes=durations[session.movie_id]
+        )
+
+
+class BulkImporter:
+    def __init__(
+        self, batch_size: int = 5000, using: str = "default", progress=None
+    ) -> None:
+        self.batch_size = batch_size
+        self.using = using
+        self.progress = progress
+        # models in the order the input introduced them, which for
+        # dumpdata output puts dependencies first
+        self.buffers = {}
+        self.buffered = 0
+
+    def run(self, objects, skip: int = 0) -> int:
+        """Import ``objects`` after the first ``skip`` and return the total.
+
+        Every batch is committed on its own, so objects must not refer to
+        objects of a later batch (``dumpdata`` output lists dependencies
+        first; the bundled fixture needs its users moved to the front).
+        ``progress(count)`` is called with the number of committed objects
+        after every batch; passing it back as ``skip`` resumes the import.
+        """
+        count = skip
+        objects = iter(objects)
+        for _ in zip(range(skip), objects):
+            pass
+        try:
+            for deserialized in serializers.deserialize(
+                "python", objects, using=self.using
+            ):
+                self.buffers.setdefault(
+                    type(deserialized.object), []
+                ).append(deserialized)
+                self.buffered += 1
+                if self.buffered >= self.batch_size:
+                    count += self.flush()
+            count += self.flush()
+        finally:
+            # committed batches stay even when a later one fails
+            self.reset_sequences(list(self.buffers))
+        # bulk_create skips the signals that keep tickets_sold current
+        for _ in reconcile_tickets_sold():
+            pass
+        return count
+
+    def reset_sequences(self, imported_models) -> None:
+        """Move primary key sequences past the imported keys.
+
+        Objects are inserted with their own primary keys, which backends
+        with sequences (PostgreSQL, Oracle) would hand out again.
+        """
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), imported_models
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def flush(self) -> int:
+        flushed = self.buffered
+        if flushed:
+            with transaction.atomic(using=self.using):
+                for model, deserialized in self.buffers.items():
+                    if deserialized:
+                        self._insert(model, deserialized)
+            for deserialized in self.buffers.values():
+                deserialized.clear()
+            self.buffered = 0
+            if self.progress:
+                self.progress(flushed)
+        return flushed
+
+    def _insert(self, model, deserialized) -> None:
+        instances = [item.object for item in deserialized]
+        if model is Ticket:
+            validate_tickets(instances)
+        if model is CinemaHall:
+            # bulk_create skips the pre_save signal that sets capacity
+            for hall in instances:
+                hall.clean()
+                hall.update_capacity()
+        if not settings.USE_TZ:
+            make_datetimes_naive(model, instances)
+        if model is MovieSession:
+            set_end_times(instances)
+        # auto_now_add would overwrite imported timestamps on insert
+        timestamps = [
+            field.attname
+            for field in model._meta.concrete_fields
+            if getattr(field, "auto_now", False)
+            or getattr(field, "auto_now_add", False)
+        ]
+        imported = [
+            [getattr(instance, attname) for attname in timestamps]
+            for instance in instances
+        ]
+        manager = model._base_manager.using(self.using)
+        manager.bulk_create(instances)
+        if timestamps and any(any(values) for values in imported):
+            for instance, values in zip(instances, imported):
+                for attname, value in zip(timestamps, values):
+                    if value is not None:
+                        setattr(instance, attname, value)
+            manager.bulk_update(instances, timestamps)
+
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f"{field.m2m_field_name()}_id"
+            target = f"{field.m2m_reverse_field_name()}_id"
+            through._base_manager.using(self.using).bulk_create(
+                through(**{source: item.object.pk, target: target_pk})
+                for item in deserialized
+                for target_pk in item.m2m_data.get(field.name, ())
+            )
+
+        if model is Movie:
+            get_search_backend(self.using).index(
+                movie_documents(
+                    Movie.objects.using(self.using).filter(
+                        id__in=[instance.pk for instance in instances]
+                    )
+                )
+            )
+        if model in CATALOGUE_MODELS:
+            bump_version(model)
+        if model in (MovieSession, Ticket):
+            # retires every cached day schedule
+            bump_version(MovieSession)
+        if model is Ticket:
+            for movie_session_id in {
+                ticket.movie_session_id for ticket in instances
+            }:
+                invalidate_seat_map(movie_session_id)
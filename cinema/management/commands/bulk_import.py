@@ -0,0 +1,98 @@
+import json
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import IntegrityError
+
+from cinema.importer import BulkImporter, read_objects
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import fixture objects from a JSON array, JSON lines or CSV "
+        "file, committing in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="A .json fixture, a .jsonl/.ndjson file or a .csv file.",
+        )
+        parser.add_argument(
+            "--model",
+            help="Model label of the rows of a CSV file, e.g. cinema.ticket.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of objects committed at a time.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help=(
+                "File recording how many objects are committed; an "
+                "interrupted import started again with it resumes there."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        checkpoint = options["checkpoint"]
+        skip = self.read_checkpoint(checkpoint, path)
+        if skip:
+            self.stdout.write(f"Resuming after {skip} objects")
+
+        started = time.monotonic()
+        committed = skip
+
+        def progress(count):
+            nonlocal committed
+            committed += count
+            if checkpoint:
+                self.write_checkpoint(checkpoint, path, committed)
+            rate = (committed - skip) / (time.monotonic() - started)
+            self.stdout.write(
+                f"Imported {committed} objects ({rate:.0f} objects/s)"
+            )
+
+        importer = BulkImporter(options["batch_size"], progress=progress)
+        try:
+            with open(path, encoding="utf-8", newline="") as stream:
+                total = importer.run(
+                    read_objects(stream, path, options["model"]), skip
+                )
+        except (
+            DeserializationError,
+            IntegrityError,
+            ValidationError,
+            ValueError,
+        ) as error:
+            raise CommandError(
+                f"Import stopped after {committed} objects: {error}"
+            )
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(f"Imported {total} objects"))
+
+    @staticmethod
+    def read_checkpoint(checkpoint: str | None, path: str) -> int:
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as file:
+            state = json.load(file)
+        if state["path"] != path:
+            raise CommandError(
+                f"Checkpoint {checkpoint} belongs to {state['path']}."
+            )
+        return state["objects"]
+
+    @staticmethod
+    def write_checkpoint(checkpoint: str, path: str, objects: int) -> None:
+        # replace the file atomically so a crash never leaves it half written
+        with open(f"{checkpoint}.tmp", "w") as file:
+            json.dump({"path": path, "objects": objects}, file)
+        os.replace(f"{checkpoint}.tmp", checkpoint)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from cinema.booking import expire_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Forget the Idempotency-Keys of orders past their time to live."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of orders updated per query.",
+        )
+
+    def handle(self, *args, **options):
+        expired = expire_idempotency_keys(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Expired {expired} idempotency keys")
+        )
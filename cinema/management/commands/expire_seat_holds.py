@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from cinema.booking import delete_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Delete seat holds whose expiry time has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of holds deleted per query.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_holds(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} expired seat holds")
+        )
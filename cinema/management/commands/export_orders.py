@@ -0,0 +1,53 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from cinema.export import FORMATS, ticket_rows
+
+
+class Command(BaseCommand):
+    help = "Stream the tickets of all orders as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default="csv",
+            help="Output format.",
+        )
+        parser.add_argument(
+            "--created-after",
+            type=datetime.date.fromisoformat,
+            help="Only orders created on or after this date (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--created-before",
+            type=datetime.date.fromisoformat,
+            help="Only orders created on or before this date (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of rows fetched from the database at a time.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write to this file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        render, _ = FORMATS[options["format"]]
+        lines = render(
+            ticket_rows(
+                options["created_after"],
+                options["created_before"],
+                options["chunk_size"],
+            )
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,88 @@
+import datetime
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from cinema.importer import BulkImporter
+from cinema.synthetic import DatasetOptions, generate
+
+MODELS = (
+    "user.user",
+    "cinema.genre",
+    "cinema.actor",
+    "cinema.cinemahall",
+    "cinema.movie",
+    "cinema.moviesession",
+    "cinema.order",
+    "cinema.ticket",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic dataset of halls, movies, "
+        "sessions, users and their orders."
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatasetOptions()
+        for name, type_, help_text in (
+            ("halls", int, "Number of cinema halls."),
+            ("movies", int, "Number of movies."),
+            ("actors", int, "Number of actors."),
+            ("users", int, "Number of users placing orders."),
+            ("days", int, "Number of days with sessions."),
+            ("sessions-per-day", int, "Sessions per hall and day."),
+            ("fill", float, "Mean share of seats sold per session."),
+            ("start", datetime.date.fromisoformat, "First day (YYYY-MM-DD)."),
+            ("seed", int, "Random seed; equal seeds give equal data."),
+        ):
+            parser.add_argument(
+                f"--{name}",
+                type=type_,
+                default=getattr(defaults, name.replace("-", "_")),
+                help=help_text,
+            )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of objects committed at a time.",
+        )
+
+    def handle(self, *args, **options):
+        dataset = DatasetOptions(
+            **{
+                field: options[field]
+                for field in DatasetOptions.__dataclass_fields__
+            }
+        )
+        # new objects go after the existing ones
+        first_ids = {
+            label: (
+                apps.get_model(label).objects.aggregate(last=Max("pk"))["last"]
+                or 0
+            ) + 1
+            for label in MODELS
+        }
+        started = time.monotonic()
+        generated = 0
+
+        def progress(count):
+            nonlocal generated
+            generated += count
+            self.stdout.write(f"Generated {generated} objects")
+
+        importer = BulkImporter(options["batch_size"], progress=progress)
+        try:
+            total = importer.run(generate(dataset, first_ids))
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {total} objects in "
+                f"{time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from cinema.models import Movie
+from cinema.search import get_search_backend, movie_documents
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text movie search index from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of movies indexed at once.",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.drop_index()
+        backend.create_index()
+        movie_ids = list(Movie.objects.values_list("id", flat=True))
+        batch_size = options["batch_size"]
+        for start in range(0, len(movie_ids), batch_size):
+            batch = movie_ids[start:start + batch_size]
+            backend.index(
+                movie_documents(Movie.objects.filter(id__in=batch))
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {len(movie_ids)} movies")
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from cinema.booking import reconcile_tickets_sold
+
+
+class Command(BaseCommand):
+    help = "Find and repair movie sessions whose tickets_sold has drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of movie sessions checked per query.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drifted sessions.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for movie_session_id, tickets_sold, actual in reconcile_tickets_sold(
+            options["batch_size"], fix=not options["dry_run"]
+        ):
+            drifted += 1
+            self.stdout.write(
+                f"Movie session {movie_session_id}: "
+                f"tickets_sold {tickets_sold}, actual {actual}"
+            )
+        action = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} {drifted} drifted movie sessions")
+        )
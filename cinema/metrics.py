@@ -0,0 +1,238 @@
+"""Per-view request metrics and query budgets.
+
+``RequestMetricsMiddleware`` records the SQL query count, DB time,
+serializer time and total latency of every request, keyed by the view
+that served it (``MovieSessionViewSet.list``,
+``async_views.movie_session_list``), and aggregates them in process into
+the histograms ``MetricsView`` exposes. Work done while a streaming
+response is consumed is not included.
+
+``CINEMA_QUERY_BUDGETS`` maps view keys to the most queries a request
+may run. Going over budget logs a warning, or raises
+``QueryBudgetExceeded`` when ``CINEMA_ENFORCE_QUERY_BUDGETS`` is set, as
+it is under tests, so N+1 regressions fail the test run.
+"""
+
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# contextvars follow a request into sync_to_async threads, where the
+# async ORM runs its queries
+_current = contextvars.ContextVar("cinema_request_metrics", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.in_serializer = False
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def _instrument_connection(sender, connection, **kwargs) -> None:
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def timed_serializer_data(fget):
+    """Add the time spent in a serializer's ``data`` to the request.
+
+    Queries run while serializing count as DB time, not serializer time.
+    """
+
+    @functools.wraps(fget)
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.in_serializer:
+            return fget(self)
+        metrics.in_serializer = True
+        db_seconds = metrics.db_seconds
+        started = time.perf_counter()
+        try:
+            return fget(self)
+        finally:
+            metrics.in_serializer = False
+            metrics.serializer_seconds += (
+                time.perf_counter() - started
+                - (metrics.db_seconds - db_seconds)
+            )
+
+    return data
+
+
+def instrument() -> None:
+    """Count queries on every connection and time DRF serializers."""
+    from rest_framework.serializers import BaseSerializer
+
+    connection_created.connect(
+        _instrument_connection, dispatch_uid="cinema_request_metrics"
+    )
+    if not hasattr(BaseSerializer.data.fget, "__wrapped__"):
+        # Serializer.data and ListSerializer.data both end up here, and
+        # nested serializers only call to_representation
+        BaseSerializer.data = property(
+            timed_serializer_data(BaseSerializer.data.fget)
+        )
+
+
+class Histogram:
+    def __init__(self, buckets) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self, requests: int) -> dict:
+        labels = [f"le_{bucket}" for bucket in self.buckets] + ["le_inf"]
+        return {
+            "mean": round(self.total / requests, 3),
+            "max": round(self.max, 3),
+            "histogram": dict(zip(labels, self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """In-process aggregates; every worker process keeps its own."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views = {}
+
+    def record(self, view: str, metrics: RequestMetrics, latency: float):
+        with self._lock:
+            if view not in self._views:
+                self._views[view] = {
+                    "requests": 0,
+                    "queries": Histogram(QUERY_BUCKETS),
+                    "db_ms": Histogram(LATENCY_BUCKETS_MS),
+                    "serializer_ms": Histogram(LATENCY_BUCKETS_MS),
+                    "latency_ms": Histogram(LATENCY_BUCKETS_MS),
+                }
+            aggregates = self._views[view]
+            aggregates["requests"] += 1
+            aggregates["queries"].observe(metrics.queries)
+            aggregates["db_ms"].observe(metrics.db_seconds * 1000)
+            aggregates["serializer_ms"].observe(
+                metrics.serializer_seconds * 1000
+            )
+            aggregates["latency_ms"].observe(latency * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                view: {
+                    name: (
+                        value.as_dict(aggregates["requests"])
+                        if isinstance(value, Histogram)
+                        else value
+                    )
+                    for name, value in aggregates.items()
+                }
+                for view, aggregates in sorted(self._views.items())
+            }
+
+
+registry = MetricsRegistry()
+
+
+def view_key(request, view_func) -> str:
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        module = view_func.__module__.rsplit(".", 1)[-1]
+        return f"{module}.{view_func.__name__}"
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method, method)}"
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, metrics, time.perf_counter() - started)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_key(request, view_func)
+
+    @staticmethod
+    def finish(request, metrics: RequestMetrics, latency: float) -> None:
+        view = getattr(request, "metrics_view", None)
+        if view is None:
+            return
+        registry.record(view, metrics, latency)
+        budget = getattr(settings, "CINEMA_QUERY_BUDGETS", {}).get(view)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = (
+            f"{view} ran {metrics.queries} queries, "
+            f"its budget is {budget}"
+        )
+        if getattr(settings, "CINEMA_ENFORCE_QUERY_BUDGETS", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moviesession',
+            index=models.Index(fields=['movie', 'show_time'], name='movie_session_movie_time_idx'),
+        ),
+    ]
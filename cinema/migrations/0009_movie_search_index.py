@@ -0,0 +1,103 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+# a frozen copy of the index cinema.search builds at this point; a
+# CINEMA_SEARCH_BACKEND of its own is filled by rebuild_search_index
+SEARCH_TABLE = "cinema_movie_search"
+
+CREATE_INDEX = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "USING fts5(title, description, genres, actors, "
+        "tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        # needs a role allowed to create extensions, which the one
+        # serving requests may not be
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "movie_id bigint PRIMARY KEY "
+        "REFERENCES cinema_movie (id) ON DELETE CASCADE, "
+        "title text NOT NULL, "
+        "document tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+        f"ON {SEARCH_TABLE} USING gin (document)",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_title_trgm_idx "
+        f"ON {SEARCH_TABLE} USING gin (title gin_trgm_ops)",
+    ],
+}
+
+INSERT_DOCUMENT = {
+    "sqlite": (
+        f"INSERT INTO {SEARCH_TABLE} "
+        "(rowid, title, description, genres, actors) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    ),
+    "postgresql": (
+        f"INSERT INTO {SEARCH_TABLE} (movie_id, title, document) "
+        "VALUES (%s, %s, "
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'B') || "
+        "setweight(to_tsvector('simple', %s), 'C') || "
+        "setweight(to_tsvector('simple', %s), 'B'))"
+    ),
+}
+
+
+def movie_documents(Movie):
+    genres = defaultdict(list)
+    actors = defaultdict(list)
+    movies = Movie.objects.all()
+    for movie_id, name in movies.filter(genres__isnull=False).values_list(
+        "id", "genres__name"
+    ):
+        genres[movie_id].append(name)
+    for movie_id, first_name, last_name in movies.filter(
+        actors__isnull=False
+    ).values_list("id", "actors__first_name", "actors__last_name"):
+        actors[movie_id].append(f"{first_name} {last_name}")
+    for movie_id, title, description in movies.values_list(
+        "id", "title", "description"
+    ):
+        yield (
+            movie_id,
+            title,
+            description,
+            " ".join(genres[movie_id]),
+            " ".join(actors[movie_id]),
+        )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_INDEX:
+        return
+    Movie = apps.get_model("cinema", "Movie")
+    documents = list(movie_documents(Movie))
+    if vendor == "postgresql":
+        documents = [
+            (movie_id, title, title, genres, description, actors)
+            for movie_id, title, description, genres, actors in documents
+        ]
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CREATE_INDEX[vendor]:
+            cursor.execute(sql)
+        cursor.executemany(INSERT_DOCUMENT[vendor], documents)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_INDEX:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cinema", "0008_movie_session_movie_show_time_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
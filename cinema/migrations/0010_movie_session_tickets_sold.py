@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tickets_sold(apps, schema_editor):
+    MovieSession = apps.get_model('cinema', 'MovieSession')
+    Ticket = apps.get_model('cinema', 'Ticket')
+    sold = Ticket.objects.filter(
+        movie_session=OuterRef('pk')
+    ).order_by().values('movie_session').annotate(
+        count=Count('id')
+    ).values('count')
+    MovieSession.objects.update(tickets_sold=Coalesce(Subquery(sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0009_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moviesession',
+            name='tickets_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tickets_sold, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:55
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def count_capacity(apps, schema_editor):
+    CinemaHall = apps.get_model('cinema', 'CinemaHall')
+    # existing halls have no layout, so every seat is for sale
+    CinemaHall.objects.update(capacity=F('rows') * F('seats_in_row'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0010_movie_session_tickets_sold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cinemahall',
+            name='capacity',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cinemahall',
+            name='layout',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(count_capacity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:10
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+
+
+def set_end_times(apps, schema_editor):
+    Movie = apps.get_model('cinema', 'Movie')
+    MovieSession = apps.get_model('cinema', 'MovieSession')
+    for movie_id, duration in Movie.objects.values_list('id', 'duration'):
+        MovieSession.objects.filter(movie_id=movie_id).update(
+            end_time=ExpressionWrapper(
+                F('show_time') + datetime.timedelta(minutes=duration),
+                output_field=models.DateTimeField(),
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0011_cinema_hall_layout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moviesession',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_end_times, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='moviesession',
+            name='end_time',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='moviesession',
+            index=models.Index(
+                fields=['cinema_hall', 'end_time', 'show_time'],
+                name='movie_session_hall_end_idx',
+            ),
+        ),
+    ]
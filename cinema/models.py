@@ -1,16 +1,44 @@
+from datetime import timedelta
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
+
+from cinema.expressions import JSONArraySubquery
+from cinema.hall_layout import HallLayout, get_hall_layout, layout_error
 
 
 class CinemaHall(models.Model):
     name = models.CharField(max_length=255)
     rows = models.IntegerField()
     seats_in_row = models.IntegerField()
+    # one string per row, see cinema.hall_layout
+    layout = models.JSONField(default=list, blank=True)
+    # seats for sale, kept in step with the layout by a pre_save signal
+    capacity = models.PositiveIntegerField(default=0, editable=False)
 
     @property
-    def capacity(self) -> int:
-        return self.rows * self.seats_in_row
+    def seat_layout(self) -> HallLayout:
+        return get_hall_layout(self.rows, self.seats_in_row, self.layout)
+
+    def update_capacity(self) -> None:
+        self.capacity = self.seat_layout.capacity
+
+    @staticmethod
+    def validate_layout(
+        rows: int, seats_in_row: int, layout, error_to_raise
+    ) -> None:
+        error = layout_error(rows, seats_in_row, layout)
+        if error:
+            raise error_to_raise({"layout": error})
+
+    def clean(self) -> None:
+        CinemaHall.validate_layout(
+            self.rows, self.seats_in_row, self.layout, ValidationError
+        )
 
     def __str__(self) -> str:
         return self.name
@@ -35,6 +63,28 @@ class Actor(models.Model):
         return self.full_name
 
 
+class MovieQuerySet(models.QuerySet):
+    def with_names(self) -> "MovieQuerySet":
+        """Annotate genre names and actor full names as JSON arrays."""
+        genres = Movie.genres.through.objects.filter(
+            movie=OuterRef("pk")
+        ).order_by("genre_id").values(item=F("genre__name"))
+        actors = Movie.actors.through.objects.filter(
+            movie=OuterRef("pk")
+        ).order_by("actor_id").values(
+            item=Concat(
+                "actor__first_name",
+                Value(" "),
+                "actor__last_name",
+                output_field=models.CharField(),
+            )
+        )
+        return self.annotate(
+            genre_names=JSONArraySubquery(genres),
+            actor_names=JSONArraySubquery(actors),
+        )
+
+
 class Movie(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -42,6 +92,8 @@ class Movie(models.Model):
     genres = models.ManyToManyField(Genre)
     actors = models.ManyToManyField(Actor)
 
+    objects = MovieQuerySet.as_manager()
+
     class Meta:
         ordering = ["title"]
 
@@ -49,27 +101,145 @@ class Movie(models.Model):
         return self.title
 
 
+class MovieSessionQuerySet(models.QuerySet):
+    def with_tickets_available(self) -> "MovieSessionQuerySet":
+        active_holds = (
+            SeatHold.objects.active()
+            .filter(movie_session=OuterRef("pk"))
+            .values("movie_session")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return self.select_related("movie", "cinema_hall").annotate(
+            cinema_hall_capacity=F("cinema_hall__capacity"),
+            tickets_available=(
+                F("cinema_hall_capacity")
+                - F("tickets_sold")
+                - Coalesce(Subquery(active_holds), 0)
+            ),
+        )
+
+
 class MovieSession(models.Model):
     show_time = models.DateTimeField()
+    # show_time plus the movie's duration, kept in step by signals
+    end_time = models.DateTimeField(editable=False)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     cinema_hall = models.ForeignKey(CinemaHall, on_delete=models.CASCADE)
+    # kept in step with the tickets by booking code and Ticket signals
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = MovieSessionQuerySet.as_manager()
 
     class Meta:
         ordering = ["-show_time"]
+        indexes = [
+            models.Index(
+                fields=("-show_time", "-id"),
+                name="movie_session_show_time_idx",
+            ),
+            models.Index(
+                fields=("movie", "show_time"),
+                name="movie_session_movie_time_idx",
+            ),
+            # overlap checks scan a hall's sessions ending after a time
+            models.Index(
+                fields=("cinema_hall", "end_time", "show_time"),
+                name="movie_session_hall_end_idx",
+            ),
+        ]
+
+    def update_end_time(self) -> None:
+        self.end_time = self.show_time + timedelta(
+            minutes=self.movie.duration
+        )
 
     def __str__(self) -> str:
         return f"{self.movie.title} {self.show_time}"
 
 
+class SeatHoldQuerySet(models.QuerySet):
+    def active(self) -> "SeatHoldQuerySet":
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self) -> "SeatHoldQuerySet":
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class SeatHold(models.Model):
+    movie_session = models.ForeignKey(
+        MovieSession,
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = SeatHoldQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("movie_session", "row", "seat"),
+                name="unique_movie_session_hold",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("movie_session", "expires_at"),
+                name="seat_hold_session_expiry_idx",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.movie_session} (row: {self.row}, seat: {self.seat}) "
+            f"held until {self.expires_at}"
+        )
+
+
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # the Idempotency-Key header the order was created with and a hash of
+    # its request body; cleared after IDEMPOTENCY_KEY_TTL_SECONDS
+    idempotency_key = models.CharField(
+        max_length=255, null=True, blank=True, editable=False
+    )
+    request_fingerprint = models.CharField(
+        max_length=64, blank=True, editable=False
+    )
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "idempotency_key"),
+                condition=models.Q(idempotency_key__isnull=False),
+                name="unique_order_idempotency_key",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-created_at", "-id"),
+                name="order_user_created_at_idx",
+            ),
+            # partial, so expiring keys only scans orders that have one
+            models.Index(
+                fields=("created_at",),
+                condition=models.Q(idempotency_key__isnull=False),
+                name="order_idempotency_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Order {self.id} at {self.created_at}"
@@ -97,14 +267,20 @@ class Ticket(models.Model):
             )
         ]
 
-    def clean(self) -> None:
+    @staticmethod
+    def validate_ticket(
+        row: int,
+        seat: int,
+        cinema_hall: CinemaHall,
+        error_to_raise,
+    ) -> None:
         for value, field_name, hall_attr in [
-            (self.row, "row", "rows"),
-            (self.seat, "seat", "seats_in_row"),
+            (row, "row", "rows"),
+            (seat, "seat", "seats_in_row"),
         ]:
-            max_value = getattr(self.movie_session.cinema_hall, hall_attr)
+            max_value = getattr(cinema_hall, hall_attr)
             if not (1 <= value <= max_value):
-                raise ValidationError(
+                raise error_to_raise(
                     {
                         field_name: (
                             f"{field_name} number must be in available range: "
@@ -112,6 +288,22 @@ class Ticket(models.Model):
                         )
                     }
                 )
+        if cinema_hall.seat_layout.category(row, seat) is None:
+            raise error_to_raise(
+                {
+                    "seat": (
+                        f"seat ({row}, {seat}) is not for sale in this hall"
+                    )
+                }
+            )
+
+    def clean(self) -> None:
+        Ticket.validate_ticket(
+            self.row,
+            self.seat,
+            self.movie_session.cinema_hall,
+            ValidationError,
+        )
 
     def save(
         self,
@@ -0,0 +1,217 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from cinema.models import MovieSession, Order
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks by the full ordering key.
+
+    The last field of ``ordering`` must be unique (usually ``id``), so a
+    page always starts strictly after the previous one and costs the same
+    as the first one when the ordering is backed by an index. Cursor values
+    are converted back to the types of the ``model`` fields they come from.
+    """
+
+    model = None
+    ordering = ("-id",)
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._page_queryset(queryset, request)
+        return self._page([row async for row in page_queryset])
+
+    def paginate_rows(self, rows, request) -> list:
+        """``paginate_queryset`` over rows already in memory."""
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+        keyed = [(self._position(row), row) for row in rows]
+        # stable sorts from the last field to the first
+        for index in reversed(range(len(ordering))):
+            keyed.sort(
+                key=lambda item: item[0][index],
+                reverse=ordering[index].startswith("-"),
+            )
+        if self.position is not None:
+            keyed = [
+                item
+                for item in keyed
+                if self._is_after(ordering, item[0], self.position)
+            ]
+        return self._page([row for _, row in keyed[:self.limit + 1]])
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self._seek(ordering, self.position))
+        return queryset[:self.limit + 1]
+
+    def _page(self, rows):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = self.position is not None and (
+            has_more or not self.reverse
+        )
+        self.next_position = self._position(rows[-1]) if rows else None
+        self.previous_position = self._position(rows[0]) if rows else None
+        if not rows:
+            self.has_next = self.has_previous = False
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data) -> dict:
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {
+                    "type": "string", "nullable": True, "format": "uri"
+                },
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor["p"], bool(cursor["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+            len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return [
+            self._cursor_value(field.lstrip("-"), value)
+            for field, value in zip(self.ordering, position)
+        ], reverse
+
+    def _cursor_value(self, name: str, value):
+        """Convert a decoded cursor value to the type of its field."""
+        field = self.model._meta.get_field(name)
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        # encode_cursor never writes nulls or the other kind of datetime
+        if value is None or (
+            isinstance(value, datetime.datetime)
+            and timezone.is_aware(value) != settings.USE_TZ
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return value
+
+    def encode_cursor(self, position, reverse):
+        cursor = json.dumps({"p": position, "r": int(reverse)}, default=str)
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def _position(self, row) -> list:
+        names = [field.lstrip("-") for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    @staticmethod
+    def _invert(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _is_after(ordering, values, position) -> bool:
+        """``_seek`` for a row already in memory."""
+        for field, value, seek in zip(ordering, values, position):
+            if value != seek:
+                if field.startswith("-"):
+                    return value < seek
+                return value > seek
+        return False
+
+    @staticmethod
+    def _seek(ordering, position) -> Q:
+        """Rows strictly after ``position`` in the given ordering."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class MovieSessionPagination(KeysetPagination):
+    model = MovieSession
+    ordering = ("-show_time", "-id")
+
+
+class OrderPagination(KeysetPagination):
+    model = Order
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,95 @@
+"""Overlap checks for the movie sessions of a hall.
+
+A session occupies its hall from ``show_time`` until ``end_time``, the
+show time plus the movie's duration; two sessions of a hall overlap when
+each starts before the other ends. Only sessions ending after a new one
+starts can overlap it, so the ``(cinema_hall, end_time, show_time)``
+index turns the check into a range scan over the hall's upcoming
+schedule, however many years of history the hall has.
+"""
+
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from cinema.models import MovieSession
+
+
+def overlapping_sessions(cinema_hall, show_time, end_time, exclude=None):
+    queryset = MovieSession.objects.filter(
+        cinema_hall=cinema_hall,
+        end_time__gt=show_time,
+        show_time__lt=end_time,
+    ).order_by("show_time")
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset
+
+
+def schedule_conflicts(sessions) -> list[str]:
+    """Describe the overlaps of new or moved ``sessions``, at most ten.
+
+    The sessions are checked against each other and against the stored
+    ones with a single query: the stored sessions of every hall that
+    overlap the span of the hall's sessions are fetched at once, and
+    every hall's timeline is swept in start order. A saved session
+    replaces its stored times.
+    """
+    new = defaultdict(list)
+    moved = []
+    for number, session in enumerate(sessions, start=1):
+        label = f"Session {number}"
+        if session.pk is not None:
+            moved.append(session.pk)
+            label = f"movie session {session.pk}"
+        new[session.cinema_hall_id].append(
+            (session.show_time, session.end_time, label)
+        )
+    if not new:
+        return []
+    spans = reduce(
+        or_,
+        (
+            Q(
+                cinema_hall_id=cinema_hall_id,
+                end_time__gt=min(start for start, _, _ in timeline),
+                show_time__lt=max(end for _, end, _ in timeline),
+            )
+            for cinema_hall_id, timeline in new.items()
+        ),
+    )
+    stored = defaultdict(list)
+    for movie_session_id, cinema_hall_id, start, end in (
+        MovieSession.objects.filter(spans)
+        .exclude(pk__in=moved)
+        .order_by()
+        .values_list("id", "cinema_hall_id", "show_time", "end_time")
+    ):
+        stored[cinema_hall_id].append(
+            (start, end, f"movie session {movie_session_id}")
+        )
+
+    errors = []
+    for cinema_hall_id, timeline in new.items():
+        labels = {label for _, _, label in timeline}
+        timeline = sorted(timeline + stored[cinema_hall_id])
+        latest = timeline[0]
+        for current in timeline[1:]:
+            # stored sessions overlapping each other are not ours to report
+            if current[0] < latest[1] and (
+                current[2] in labels or latest[2] in labels
+            ):
+                first, second = sorted(
+                    (latest, current), key=lambda item: item[2] not in labels
+                )
+                errors.append(
+                    f"{first[2]} overlaps {second[2]} in cinema hall "
+                    f"{cinema_hall_id}."
+                )
+            if current[1] > latest[1]:
+                latest = current
+    if len(errors) > 10:
+        errors[10:] = [f"... and {len(errors) - 10} more"]
+    return errors
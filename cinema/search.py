@@ -0,0 +1,252 @@
+import abc
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+SEARCH_TABLE = "cinema_movie_search"
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def movie_documents(movies) -> list[tuple]:
+    """Return ``(id, title, description, genres, actors)`` per movie.
+
+    ``movies`` may be a queryset of a historical model, so that migrations
+    can build the index too.
+    """
+    genres = defaultdict(list)
+    actors = defaultdict(list)
+    for movie_id, name in movies.filter(genres__isnull=False).values_list(
+        "id", "genres__name"
+    ):
+        genres[movie_id].append(name)
+    for movie_id, first_name, last_name in movies.filter(
+        actors__isnull=False
+    ).values_list("id", "actors__first_name", "actors__last_name"):
+        actors[movie_id].append(f"{first_name} {last_name}")
+    return [
+        (
+            movie_id,
+            title,
+            description,
+            " ".join(genres[movie_id]),
+            " ".join(actors[movie_id]),
+        )
+        for movie_id, title, description in movies.values_list(
+            "id", "title", "description"
+        )
+    ]
+
+
+class SearchBackend(abc.ABC):
+    """Ranked movie search over title, description, genres and actors."""
+
+    max_results = 500
+
+    def __init__(self, using: str = "default") -> None:
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def create_index(self) -> None:
+        pass
+
+    def _compile(self, queryset) -> tuple[str, tuple]:
+        return queryset.query.get_compiler(self.using).as_sql()
+
+    def drop_index(self) -> None:
+        pass
+
+    def index(self, documents) -> None:
+        pass
+
+    def remove(self, movie_ids) -> None:
+        pass
+
+    @abc.abstractmethod
+    def ranked_ids(self, terms: list[str], candidates) -> list[int]:
+        """Rank the ids of ``candidates`` (a ``values("id")`` queryset)."""
+
+    def search(self, queryset, terms: list[str]):
+        # ranked among the movies the other filters left, so that the cap
+        # on results cannot drop the ones they select
+        movie_ids = self.ranked_ids(terms, queryset.order_by().values("id"))
+        return queryset.filter(id__in=movie_ids).order_by(
+            Case(
+                *(
+                    When(id=movie_id, then=Value(position))
+                    for position, movie_id in enumerate(movie_ids)
+                ),
+                output_field=IntegerField(),
+            )
+        )
+
+
+class LikeSearchBackend(SearchBackend):
+    """Unindexed fallback for databases without full-text support."""
+
+    def ranked_ids(self, terms: list[str], candidates) -> list[int]:
+        # unranked: every matching candidate is as good as the next
+        movies = candidates.model.objects.filter(id__in=candidates)
+        return list(
+            self.search(movies, terms)
+            .order_by("id")
+            .values_list("id", flat=True)[: self.max_results]
+        )
+
+    def search(self, queryset, terms: list[str]):
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term)
+                | Q(description__icontains=term)
+                | Q(genres__name__icontains=term)
+                | Q(actors__first_name__icontains=term)
+                | Q(actors__last_name__icontains=term)
+            )
+        return queryset.distinct()
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table keyed by movie id, ranked with bm25."""
+
+    # bm25 weights of the title, description, genres and actors columns
+    weights = (10.0, 1.0, 4.0, 4.0)
+
+    def create_index(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                "USING fts5(title, description, genres, actors, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def drop_index(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index(self, documents) -> None:
+        documents = list(documents)
+        self.remove(document[0] for document in documents)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} "
+                "(rowid, title, description, genres, actors) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                documents,
+            )
+
+    def remove(self, movie_ids) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [(movie_id,) for movie_id in movie_ids],
+            )
+
+    def ranked_ids(self, terms: list[str], candidates) -> list[int]:
+        # every word has to match, the last one as a prefix while typing
+        words = WORD_RE.findall(" ".join(terms))
+        if not words:
+            return []
+        query = " ".join(f'"{word}"*' for word in words)
+        weights = ", ".join(str(weight) for weight in self.weights)
+        candidates, params = self._compile(candidates)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} "
+                f"WHERE {SEARCH_TABLE} MATCH %s AND rowid IN ({candidates}) "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s",
+                [query, *params, self.max_results],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted tsvector plus trigram similarity on the title."""
+
+    def create_index(self) -> None:
+        # pg_trgm is created by migration 0009, with the rights it needs
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                "movie_id bigint PRIMARY KEY "
+                "REFERENCES cinema_movie (id) ON DELETE CASCADE, "
+                "title text NOT NULL, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+                f"ON {SEARCH_TABLE} USING gin (document)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_title_trgm_idx "
+                f"ON {SEARCH_TABLE} USING gin (title gin_trgm_ops)"
+            )
+
+    def drop_index(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index(self, documents) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (movie_id, title, document) "
+                "VALUES (%s, %s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'B')) "
+                "ON CONFLICT (movie_id) DO UPDATE SET "
+                "title = EXCLUDED.title, document = EXCLUDED.document",
+                [
+                    (movie_id, title, title, genres, description, actors)
+                    for movie_id, title, description, genres, actors
+                    in documents
+                ],
+            )
+
+    def remove(self, movie_ids) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE movie_id = ANY(%s)",
+                [list(movie_ids)],
+            )
+
+    def ranked_ids(self, terms: list[str], candidates) -> list[int]:
+        words = WORD_RE.findall(" ".join(terms))
+        if not words:
+            return []
+        query = " & ".join(f"{word}:*" for word in words)
+        text = " ".join(words)
+        candidates, params = self._compile(candidates)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT movie_id FROM "
+                f"{SEARCH_TABLE}, to_tsquery('simple', %s) query "
+                "WHERE (document @@ query OR title %% %s) "
+                f"AND movie_id IN ({candidates}) "
+                "ORDER BY ts_rank(document, query) "
+                "+ similarity(title, %s) DESC "
+                "LIMIT %s",
+                [query, text, *params, text, self.max_results],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend(using: str = "default") -> SearchBackend:
+    backend_path = getattr(settings, "CINEMA_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)(using)
+    vendor = connections[using].vendor
+    return BACKENDS.get(vendor, LikeSearchBackend)(using)
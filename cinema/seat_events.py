@@ -0,0 +1,119 @@
+"""Pub/sub of seat changes, one channel per movie session.
+
+Bookings, holds and ticket edits publish ``{"taken": [...], "released":
+[...]}`` deltas once their transaction commits; the seat event stream
+subscribes to a session and forwards them to every watcher. The default
+broker fans out inside this process; set ``CINEMA_SEAT_EVENTS_BROKER`` to
+the dotted path of another ``SeatEventBroker`` to share events between
+processes.
+"""
+
+import abc
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# sent instead of the pending events when a watcher falls too far behind
+RESET = {"reset": True}
+
+
+class SeatEventBroker(abc.ABC):
+    @abc.abstractmethod
+    def publish(self, movie_session_id: int, event: dict) -> None:
+        pass
+
+    @abc.abstractmethod
+    def subscribe(self, movie_session_id: int):
+        """Return an async context manager yielding a subscription.
+
+        The subscription's ``get()`` coroutine waits for the next event.
+        """
+
+
+class _Subscription:
+    def __init__(self, max_pending: int) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_pending)
+
+    def put(self, event: dict) -> None:
+        # publishers run in worker threads, the watcher in the event loop
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # the loop is closed, the watcher is gone
+
+    def _put(self, event: dict) -> None:
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESET
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class InProcessSeatEventBroker(SeatEventBroker):
+    def __init__(self, max_pending: int = 1000) -> None:
+        self.max_pending = max_pending
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, movie_session_id: int, event: dict) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(movie_session_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    @asynccontextmanager
+    async def subscribe(self, movie_session_id: int):
+        subscription = _Subscription(self.max_pending)
+        with self._lock:
+            self._subscriptions[movie_session_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._subscriptions[movie_session_id]
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[movie_session_id]
+
+
+@lru_cache
+def _broker(broker_path: str) -> SeatEventBroker:
+    return import_string(broker_path)()
+
+
+def get_seat_event_broker() -> SeatEventBroker:
+    return _broker(
+        getattr(
+            settings,
+            "CINEMA_SEAT_EVENTS_BROKER",
+            "cinema.seat_events.InProcessSeatEventBroker",
+        )
+    )
+
+
+def _places(places) -> list[dict]:
+    return [{"row": row, "seat": seat} for row, seat in places]
+
+
+def publish_seat_changes(
+    movie_session_id: int, taken=(), released=()
+) -> None:
+    """Publish a delta for ``movie_session_id`` once the transaction commits.
+
+    ``taken`` and ``released`` are iterables of ``(row, seat)``.
+    """
+    event = {"taken": _places(taken), "released": _places(released)}
+    if event["taken"] or event["released"]:
+        transaction.on_commit(
+            lambda: get_seat_event_broker().publish(movie_session_id, event)
+        )
@@ -0,0 +1,199 @@
+import base64
+import logging
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from cinema.models import MovieSession, SeatHold, Ticket
+
+CACHE_KEY = "cinema:seat_map:{}"
+CACHE_TIMEOUT = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class SeatMap:
+    """Occupancy of a hall as a bitset, one bit per seat.
+
+    Seats are numbered row by row; seat ``(row, seat)`` is bit
+    ``(row - 1) * seats_in_row + seat - 1`` and bits are packed most
+    significant first inside every byte.
+    """
+
+    def __init__(self, rows: int, seats_in_row: int, bits=None) -> None:
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        if bits is None:
+            bits = bytes((rows * seats_in_row + 7) // 8)
+        self.bits = bytearray(bits)
+
+    def contains(self, row: int, seat: int) -> bool:
+        return 1 <= row <= self.rows and 1 <= seat <= self.seats_in_row
+
+    def _index(self, row: int, seat: int) -> int:
+        return (row - 1) * self.seats_in_row + seat - 1
+
+    def take(self, row: int, seat: int) -> None:
+        index = self._index(row, seat)
+        self.bits[index >> 3] |= 0x80 >> (index & 7)
+
+    def release(self, row: int, seat: int) -> None:
+        index = self._index(row, seat)
+        self.bits[index >> 3] &= ~(0x80 >> (index & 7)) & 0xFF
+
+    def is_taken(self, row: int, seat: int) -> bool:
+        index = self._index(row, seat)
+        return bool(self.bits[index >> 3] & (0x80 >> (index & 7)))
+
+    def taken_places(self) -> list[dict]:
+        places = []
+        for byte_index, byte in enumerate(self.bits):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (0x80 >> bit):
+                    row, seat = divmod(byte_index * 8 + bit, self.seats_in_row)
+                    places.append({"row": row + 1, "seat": seat + 1})
+        return places
+
+    def packed(self) -> dict:
+        return {
+            "rows": self.rows,
+            "seats_in_row": self.seats_in_row,
+            "bitmap": base64.b64encode(bytes(self.bits)).decode(),
+        }
+
+
+def find_best_seats(
+    seat_map: SeatMap, count: int, blocked: bytes = b""
+) -> list[tuple[int, int]]:
+    """Return the ``count`` adjacent free seats closest to the hall centre.
+
+    The bitset is rendered once as a string of ``0``/``1`` and row slices
+    are scanned for free runs of at least ``count`` seats with a regex.
+    Inside a run the block is pushed as close to the middle of the row as
+    the run allows; blocks score by their distance from the middle of the
+    row plus the distance of their row from the middle row. Rows are
+    visited outwards from the middle, front first, and the scan stops once
+    the row distance alone cannot beat the best block, so even a
+    3000-seat hall is searched in well under a millisecond. An empty list
+    means no row has ``count`` adjacent free seats. ``blocked`` is a
+    bitset in the same order, like ``HallLayout.blocked``, of places that
+    are never for sale.
+    """
+    rows, seats_in_row = seat_map.rows, seat_map.seats_in_row
+    if not 1 <= count <= seats_in_row:
+        return []
+    taken = int.from_bytes(seat_map.bits, "big")
+    if blocked:
+        taken |= int.from_bytes(blocked, "big")
+    bits = format(taken, f"0{len(seat_map.bits) * 8}b")
+    free_run = re.compile(f"0{{{count},}}")
+    centre_start = (seats_in_row - count) / 2
+    centre_row = (rows - 1) / 2
+    best = None
+    for row in sorted(range(rows), key=lambda row: abs(row - centre_row)):
+        row_distance = abs(row - centre_row)
+        if best is not None and row_distance >= best[0]:
+            break
+        row_bits = bits[row * seats_in_row:(row + 1) * seats_in_row]
+        for run in free_run.finditer(row_bits):
+            start = min(
+                max(round(centre_start), run.start()), run.end() - count
+            )
+            score = abs(start - centre_start) + row_distance
+            if best is None or score < best[0]:
+                best = (score, row, start)
+    if best is None:
+        return []
+    _, row, start = best
+    return [(row + 1, seat + 1) for seat in range(start, start + count)]
+
+
+def _cached_seat_map(movie_session, cached) -> SeatMap | None:
+    hall = movie_session.cinema_hall
+    if cached is not None and cached[:2] == (hall.rows, hall.seats_in_row):
+        return SeatMap(*cached)
+    return None
+
+
+def _tickets(movie_session):
+    return Ticket.objects.filter(
+        movie_session=movie_session
+    ).values_list("row", "seat")
+
+
+def _holds(movie_session):
+    return SeatHold.objects.active().filter(
+        movie_session=movie_session
+    ).values_list("row", "seat", "expires_at")
+
+
+def _build_seat_map(movie_session, tickets, holds) -> tuple[SeatMap, int]:
+    hall = movie_session.cinema_hall
+    seat_map = SeatMap(hall.rows, hall.seats_in_row)
+    # places left outside a hall that was made smaller cannot be drawn
+    outside = []
+    for row, seat in tickets:
+        if seat_map.contains(row, seat):
+            seat_map.take(row, seat)
+        else:
+            outside.append((row, seat))
+
+    # held seats are taken too, until the earliest hold expires
+    timeout = CACHE_TIMEOUT
+    for row, seat, expires_at in holds:
+        if seat_map.contains(row, seat):
+            seat_map.take(row, seat)
+        else:
+            outside.append((row, seat))
+        expires_in = (expires_at - timezone.now()).total_seconds()
+        timeout = max(1, min(timeout, int(expires_in)))
+    if outside:
+        logger.warning(
+            "Movie session %s has places outside its %sx%s hall: %s",
+            movie_session.id, hall.rows, hall.seats_in_row, outside[:10],
+        )
+    return seat_map, timeout
+
+
+def _cache_value(seat_map: SeatMap) -> tuple:
+    return seat_map.rows, seat_map.seats_in_row, bytes(seat_map.bits)
+
+
+def read_seat_map(movie_session: MovieSession) -> tuple[SeatMap, int]:
+    """Build the seat map from the database, bypassing the cache."""
+    return _build_seat_map(
+        movie_session, _tickets(movie_session), _holds(movie_session)
+    )
+
+
+def get_seat_map(movie_session: MovieSession) -> SeatMap:
+    key = CACHE_KEY.format(movie_session.id)
+    seat_map = _cached_seat_map(movie_session, cache.get(key))
+    if seat_map is None:
+        seat_map, timeout = read_seat_map(movie_session)
+        cache.set(key, _cache_value(seat_map), timeout)
+    return seat_map
+
+
+async def aget_seat_map(movie_session: MovieSession) -> SeatMap:
+    key = CACHE_KEY.format(movie_session.id)
+    seat_map = _cached_seat_map(movie_session, await cache.aget(key))
+    if seat_map is None:
+        seat_map, timeout = _build_seat_map(
+            movie_session,
+            [place async for place in _tickets(movie_session)],
+            [hold async for hold in _holds(movie_session)],
+        )
+        await cache.aset(key, _cache_value(seat_map), timeout)
+    return seat_map
+
+
+def invalidate_seat_map(movie_session_id: int) -> None:
+    key = CACHE_KEY.format(movie_session_id)
+    cache.delete(key)
+    # a reader may rebuild the map before this transaction is committed
+    transaction.on_commit(lambda: cache.delete(key))
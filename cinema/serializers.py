@@ -1,7 +1,14 @@
+from datetime import timedelta
+
 from rest_framework import serializers
 from cinema.models import (
-    Genre, Actor, CinemaHall, Movie, MovieSession, Order, Ticket
+    Genre, Actor, CinemaHall, Movie, MovieSession, Order, SeatHold, Ticket
 )
+from cinema.booking import book_tickets, hold_best_seats, hold_seats
+from cinema.day_schedule import invalidate_day_schedule
+from cinema.hall_layout import get_hall_layout
+from cinema.scheduling import overlapping_sessions, schedule_conflicts
+from cinema.seat_map import get_seat_map
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -20,10 +27,61 @@ class ActorSerializer(serializers.ModelSerializer):
 
 class CinemaHallSerializer(serializers.ModelSerializer):
     capacity = serializers.IntegerField(read_only=True)
+    seat_categories = serializers.SerializerMethodField()
 
     class Meta:
         model = CinemaHall
-        fields = ("id", "name", "rows", "seats_in_row", "capacity")
+        fields = ("id", "name", "rows", "seats_in_row", "layout", "capacity",
+                  "seat_categories")
+
+    def get_seat_categories(self, obj) -> dict:
+        return obj.seat_layout.category_counts
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        hall = {
+            name: attrs.get(name, getattr(self.instance, name, None))
+            for name in ("rows", "seats_in_row", "layout")
+        }
+        CinemaHall.validate_layout(
+            hall["rows"],
+            hall["seats_in_row"],
+            hall["layout"],
+            serializers.ValidationError,
+        )
+        if self.instance is not None and any(
+            value != getattr(self.instance, name)
+            for name, value in hall.items()
+        ):
+            self.validate_booked_places(hall)
+        return data
+
+    def validate_booked_places(self, hall: dict) -> None:
+        """Refuse to remove seats that are sold or held."""
+        layout = get_hall_layout(
+            hall["rows"], hall["seats_in_row"], hall["layout"]
+        )
+        places = set(
+            Ticket.objects.filter(
+                movie_session__cinema_hall=self.instance
+            ).values_list("row", "seat").distinct()
+        ) | set(
+            SeatHold.objects.active().filter(
+                movie_session__cinema_hall=self.instance
+            ).values_list("row", "seat").distinct()
+        )
+        stranded = sorted(
+            place for place in places if layout.category(*place) is None
+        )
+        if stranded:
+            seats = ", ".join(
+                f"({row}, {seat})" for row, seat in stranded[:10]
+            )
+            if len(stranded) > 10:
+                seats += f" and {len(stranded) - 10} more"
+            raise serializers.ValidationError(
+                f"Seats {seats} have tickets or holds and cannot be removed."
+            )
 
 
 class MovieSerializer(serializers.ModelSerializer):
@@ -32,6 +90,27 @@ class MovieSerializer(serializers.ModelSerializer):
         fields = ("id", "title", "description", "duration",
                   "genres", "actors")
 
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        duration = attrs.get("duration")
+        if self.instance is None or duration is None:
+            return data
+        if duration > self.instance.duration:
+            # the movie's sessions end later, into the next ones
+            movie_sessions = list(
+                self.instance.moviesession_set.only(
+                    "id", "cinema_hall", "show_time"
+                )
+            )
+            for movie_session in movie_sessions:
+                movie_session.end_time = movie_session.show_time + timedelta(
+                    minutes=duration
+                )
+            errors = schedule_conflicts(movie_sessions)
+            if errors:
+                raise serializers.ValidationError({"duration": errors})
+        return data
+
 
 class MovieListSerializer(serializers.ModelSerializer):
     genres = serializers.SlugRelatedField(
@@ -62,6 +141,33 @@ class MovieSessionSerializer(serializers.ModelSerializer):
         model = MovieSession
         fields = ("id", "show_time", "movie", "cinema_hall")
 
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        session = MovieSession(
+            **{
+                name: attrs.get(name, getattr(self.instance, name, None))
+                for name in ("show_time", "movie", "cinema_hall")
+            }
+        )
+        session.update_end_time()
+        overlapping = overlapping_sessions(
+            session.cinema_hall,
+            session.show_time,
+            session.end_time,
+            exclude=getattr(self.instance, "pk", None),
+        ).first()
+        if overlapping is not None:
+            raise serializers.ValidationError(
+                {
+                    "show_time": (
+                        f"Overlaps movie session {overlapping.id} "
+                        f"({overlapping.show_time:%Y-%m-%d %H:%M}-"
+                        f"{overlapping.end_time:%H:%M}) in this hall"
+                    )
+                }
+            )
+        return data
+
 
 class MovieSessionListSerializer(serializers.ModelSerializer):
     movie_title = serializers.CharField(
@@ -83,33 +189,162 @@ class MovieSessionListSerializer(serializers.ModelSerializer):
         )
 
     def get_tickets_available(self, obj):
-        booked = Ticket.objects.filter(movie_session=obj).count()
-        return obj.cinema_hall.capacity - booked
+        if hasattr(obj, "tickets_available"):
+            return obj.tickets_available
+        held = SeatHold.objects.active().filter(movie_session=obj).count()
+        return obj.cinema_hall.capacity - obj.tickets_sold - held
 
 
 class MovieSessionDetailSerializer(serializers.ModelSerializer):
     movie = MovieListSerializer(read_only=True)
     cinema_hall = CinemaHallSerializer(read_only=True)
     taken_places = serializers.SerializerMethodField()
+    seats_available = serializers.SerializerMethodField()
 
     class Meta:
         model = MovieSession
         fields = ("id", "show_time", "movie", "cinema_hall",
-                  "taken_places")
+                  "taken_places", "seats_available")
 
     def get_taken_places(self, obj):
-        tickets = Ticket.objects.filter(movie_session=obj)
-        return [{"row": t.row, "seat": t.seat} for t in tickets]
+        return get_seat_map(obj).taken_places()
+
+    def get_seats_available(self, obj) -> dict:
+        return obj.cinema_hall.seat_layout.seats_available(
+            get_seat_map(obj).bits
+        )
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get("request")
+        if request and request.query_params.get("seat_map") == "bitmap":
+            data["seat_map"] = get_seat_map(instance).packed()
+        return data
+
+
+class CachedRelatedField(serializers.PrimaryKeyRelatedField):
+    """Looks up every distinct primary key once per request."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._resolved = {}
+
+    def to_internal_value(self, data):
+        key = str(data)
+        if key not in self._resolved:
+            self._resolved[key] = super().to_internal_value(data)
+        return self._resolved[key]
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ("id", "row", "seat", "expires_at")
+        read_only_fields = ("id", "expires_at")
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        Ticket.validate_ticket(
+            attrs["row"],
+            attrs["seat"],
+            self.context["movie_session"].cinema_hall,
+            serializers.ValidationError,
+        )
+        return data
+
+
+class SeatHoldCreateSerializer(serializers.Serializer):
+    seats = SeatHoldSerializer(many=True, allow_empty=False)
+
+    def validate_seats(self, seats):
+        places = [(seat["row"], seat["seat"]) for seat in seats]
+        if len(set(places)) != len(places):
+            raise serializers.ValidationError(
+                "The same seat cannot be held twice in one request"
+            )
+        return seats
+
+    def create(self, validated_data):
+        return hold_seats(
+            self.context["request"].user,
+            self.context["movie_session"],
+            validated_data["seats"],
+        )
+
+
+class BestSeatsSerializer(serializers.Serializer):
+    count = serializers.IntegerField(min_value=1)
+
+    def validate_count(self, count):
+        seats_in_row = self.context["movie_session"].cinema_hall.seats_in_row
+        if count > seats_in_row:
+            raise serializers.ValidationError(
+                f"A row of this hall has only {seats_in_row} seats"
+            )
+        return count
+
+    def create(self, validated_data):
+        return hold_best_seats(
+            self.context["request"].user,
+            self.context["movie_session"],
+            validated_data["count"],
+        )
+
+
+class ScheduleSessionSerializer(serializers.ModelSerializer):
+    movie = CachedRelatedField(queryset=Movie.objects.all())
+    cinema_hall = CachedRelatedField(queryset=CinemaHall.objects.all())
+
+    class Meta:
+        model = MovieSession
+        fields = ("show_time", "movie", "cinema_hall")
+
+
+class ScheduleImportSerializer(serializers.Serializer):
+    sessions = ScheduleSessionSerializer(
+        many=True, allow_empty=False, max_length=2000
+    )
+
+    def validate_sessions(self, sessions):
+        movie_sessions = [MovieSession(**session) for session in sessions]
+        for movie_session in movie_sessions:
+            movie_session.update_end_time()
+        errors = schedule_conflicts(movie_sessions)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return movie_sessions
+
+    def create(self, validated_data):
+        # end times are set already, bulk_create skips the signals
+        movie_sessions = MovieSession.objects.bulk_create(
+            validated_data["sessions"]
+        )
+        invalidate_day_schedule(
+            *(movie_session.show_time for movie_session in movie_sessions)
+        )
+        return movie_sessions
 
 
 class TicketSerializer(serializers.ModelSerializer):
-    movie_session = serializers.PrimaryKeyRelatedField(
-        queryset=MovieSession.objects.all()
+    movie_session = CachedRelatedField(
+        queryset=MovieSession.objects.select_related("cinema_hall")
     )
 
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "movie_session")
+        # seat conflicts are checked for the whole order at once
+        validators = []
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        Ticket.validate_ticket(
+            attrs["row"],
+            attrs["seat"],
+            attrs["movie_session"].cinema_hall,
+            serializers.ValidationError,
+        )
+        return data
 
 
 class TicketListSerializer(serializers.ModelSerializer):
@@ -127,15 +362,24 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "tickets", "created_at")
 
+    def validate_tickets(self, tickets):
+        places = [
+            (ticket["movie_session"].id, ticket["row"], ticket["seat"])
+            for ticket in tickets
+        ]
+        if len(set(places)) != len(places):
+            raise serializers.ValidationError(
+                "The same seat cannot be booked twice in one order"
+            )
+        return tickets
+
     def create(self, validated_data):
         tickets_data = validated_data.pop("tickets")
-        order = Order.objects.create(
-            user=self.context["request"].user,
+        return book_tickets(
+            self.context["request"].user,
+            tickets_data,
             **validated_data
         )
-        for ticket_data in tickets_data:
-            Ticket.objects.create(order=order, **ticket_data)
-        return order
 
 
 class OrderListSerializer(serializers.ModelSerializer):
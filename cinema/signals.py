@@ -0,0 +1,198 @@
+from datetime import timedelta
+
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from cinema.booking import add_tickets_sold
+from cinema.caching import bump_version
+from cinema.models import (
+    Actor,
+    CinemaHall,
+    Genre,
+    Movie,
+    MovieSession,
+    Ticket,
+)
+from cinema.day_schedule import invalidate_day_schedule
+from cinema.search import get_search_backend, movie_documents
+from cinema.seat_events import publish_seat_changes
+from cinema.seat_map import invalidate_seat_map
+
+
+@receiver(pre_save, sender=CinemaHall)
+def cinema_hall_saving(sender, instance, **kwargs) -> None:
+    # also runs for loaddata, which saves fixtures without calling save()
+    instance.update_capacity()
+
+
+@receiver(pre_save, sender=MovieSession)
+def movie_session_saving(sender, instance, **kwargs) -> None:
+    instance.update_end_time()
+    instance._previous_show_time = None
+    if instance.pk is not None:
+        instance._previous_show_time = (
+            MovieSession.objects.filter(pk=instance.pk)
+            .values_list("show_time", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=MovieSession)
+def movie_session_saved(sender, instance, **kwargs) -> None:
+    invalidate_day_schedule(instance.show_time, instance._previous_show_time)
+
+
+@receiver(post_delete, sender=MovieSession)
+def movie_session_deleted(sender, instance, **kwargs) -> None:
+    invalidate_day_schedule(instance.show_time)
+
+
+@receiver(pre_save, sender=Movie)
+def movie_saving(sender, instance, **kwargs) -> None:
+    instance._previous_duration = None
+    if instance.pk is not None:
+        instance._previous_duration = (
+            Movie.objects.filter(pk=instance.pk)
+            .values_list("duration", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Movie)
+def movie_duration_saved(sender, instance, created, **kwargs) -> None:
+    if instance._previous_duration not in (None, instance.duration):
+        MovieSession.objects.filter(movie=instance).update(
+            end_time=ExpressionWrapper(
+                F("show_time") + timedelta(minutes=instance.duration),
+                output_field=DateTimeField(),
+            )
+        )
+
+
+@receiver(pre_save, sender=Ticket)
+def ticket_saving(sender, instance, **kwargs) -> None:
+    instance._previous_place = None
+    if instance.pk is not None:
+        instance._previous_place = (
+            Ticket.objects.filter(pk=instance.pk)
+            .values_list("movie_session", "row", "seat")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, created, **kwargs) -> None:
+    place = (instance.movie_session_id, instance.row, instance.seat)
+    previous_place = instance._previous_place
+    if not created and previous_place == place:
+        return
+    if previous_place is not None:
+        previous_id, row, seat = previous_place
+        if previous_id != instance.movie_session_id:
+            add_tickets_sold(previous_id, -1)
+            add_tickets_sold(instance.movie_session_id, 1)
+            # the previous session's day is not at hand
+            bump_version(MovieSession)
+        invalidate_seat_map(previous_id)
+        publish_seat_changes(previous_id, released=[(row, seat)])
+    else:
+        add_tickets_sold(instance.movie_session_id, 1)
+        # full_clean has loaded the session already
+        invalidate_day_schedule(instance.movie_session.show_time)
+    invalidate_seat_map(instance.movie_session_id)
+    publish_seat_changes(place[0], taken=[place[1:]])
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs) -> None:
+    add_tickets_sold(instance.movie_session_id, -1)
+    # fetching the session's day would cost a query per cascaded ticket
+    bump_version(MovieSession)
+    invalidate_seat_map(instance.movie_session_id)
+    publish_seat_changes(
+        instance.movie_session_id,
+        released=[(instance.row, instance.seat)],
+    )
+
+
+def reindex_movies(movie_ids) -> None:
+    movie_ids = set(movie_ids)
+    if movie_ids:
+        get_search_backend().index(
+            movie_documents(Movie.objects.filter(id__in=movie_ids))
+        )
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, **kwargs) -> None:
+    reindex_movies([instance.id])
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance, **kwargs) -> None:
+    get_search_backend().remove([instance.id])
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=Movie.actors.through)
+def movie_relations_changed(
+    sender, instance, action, reverse, pk_set, **kwargs
+) -> None:
+    if not reverse:
+        if action.startswith("post_"):
+            reindex_movies([instance.id])
+    elif action == "pre_clear":
+        instance._search_movie_ids = list(
+            instance.movie_set.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        reindex_movies(instance._search_movie_ids)
+    elif action.startswith("post_"):
+        reindex_movies(pk_set)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Actor)
+def movie_relation_saved(sender, instance, created, **kwargs) -> None:
+    if not created:
+        reindex_movies(instance.movie_set.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Actor)
+def movie_relation_deleting(sender, instance, **kwargs) -> None:
+    instance._search_movie_ids = list(
+        instance.movie_set.values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Actor)
+def movie_relation_deleted(sender, instance, **kwargs) -> None:
+    reindex_movies(instance._search_movie_ids)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=CinemaHall)
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Actor)
+@receiver(post_delete, sender=CinemaHall)
+@receiver(post_delete, sender=Movie)
+def catalogue_changed(sender, **kwargs) -> None:
+    bump_version(sender)
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=Movie.actors.through)
+def movie_catalogue_relations_changed(sender, action, **kwargs) -> None:
+    if action.startswith("post_"):
+        bump_version(Movie)
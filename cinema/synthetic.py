@@ -0,0 +1,168 @@
+"""Deterministic synthetic data for measuring the project at scale.
+
+``generate`` yields objects in the fixture format, dependencies first, so
+``BulkImporter`` can load any amount of them in constant memory.
+"""
+
+import datetime
+import random
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+
+WORDS = (
+    "lost", "city", "night", "river", "empire", "shadow", "last", "summer",
+    "storm", "silent", "golden", "road", "star", "winter", "secret", "fire",
+    "ocean", "dream", "iron", "garden", "return", "heart", "north", "glass",
+)
+GENRES = (
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Drama",
+    "Fantasy", "History", "Horror", "Music", "Mystery", "Romance",
+    "Sci-Fi", "Thriller", "War", "Western",
+)
+FIRST_NAMES = (
+    "Anna", "Ben", "Clara", "David", "Emma", "Frank", "Grace", "Henry",
+    "Iris", "Jack", "Kate", "Leo", "Maria", "Nick", "Olga", "Paul",
+)
+LAST_NAMES = (
+    "Adams", "Brown", "Clark", "Davis", "Evans", "Foster", "Green", "Hill",
+    "Irwin", "Jones", "King", "Lopez", "Moore", "Nolan", "Owens", "Price",
+)
+# cleaning time between two sessions in the same hall
+BREAK = datetime.timedelta(minutes=15)
+MAX_DURATION = 150
+
+
+@dataclass
+class DatasetOptions:
+    halls: int = 10
+    movies: int = 200
+    actors: int = 500
+    users: int = 1000
+    days: int = 14
+    sessions_per_day: int = 4
+    fill: float = 0.4
+    start: datetime.date = datetime.date(2024, 1, 1)
+    seed: int = 0
+
+
+def _fixture(model: str, pk: int, **fields) -> dict:
+    return {"model": model, "pk": pk, "fields": fields}
+
+
+def generate(options: DatasetOptions, first_ids: dict):
+    """Yield the dataset; ``first_ids`` maps model labels to their first pk.
+
+    Every hall runs ``sessions_per_day`` sessions a day, spaced so that
+    the longest movie fits; each session is filled to roughly ``fill`` of
+    its capacity by orders of one to six tickets.
+    """
+    rng = random.Random(options.seed)
+    slot = datetime.timedelta(minutes=MAX_DURATION) + BREAK
+    if slot * options.sessions_per_day > datetime.timedelta(hours=16):
+        raise ValueError(
+            "sessions_per_day does not fit between 9:00 and 1:00."
+        )
+
+    password = make_password("password")
+    users = range(
+        first_ids["user.user"], first_ids["user.user"] + options.users
+    )
+    for pk in users:
+        yield _fixture(
+            "user.user", pk, username=f"user{pk}", password=password
+        )
+
+    genres = range(
+        first_ids["cinema.genre"], first_ids["cinema.genre"] + len(GENRES)
+    )
+    for pk, name in zip(genres, GENRES):
+        yield _fixture("cinema.genre", pk, name=f"{name} {pk}")
+
+    actors = range(
+        first_ids["cinema.actor"], first_ids["cinema.actor"] + options.actors
+    )
+    for pk in actors:
+        yield _fixture(
+            "cinema.actor",
+            pk,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=f"{rng.choice(LAST_NAMES)}-{pk}",
+        )
+
+    halls = []
+    for pk in range(
+        first_ids["cinema.cinemahall"],
+        first_ids["cinema.cinemahall"] + options.halls,
+    ):
+        halls.append((pk, rng.randint(8, 30), rng.randint(10, 40)))
+        yield _fixture(
+            "cinema.cinemahall",
+            pk,
+            name=f"Hall {pk}",
+            rows=halls[-1][1],
+            seats_in_row=halls[-1][2],
+        )
+
+    movies = range(
+        first_ids["cinema.movie"], first_ids["cinema.movie"] + options.movies
+    )
+    for pk in movies:
+        title = " ".join(rng.sample(WORDS, rng.randint(1, 3))).title()
+        yield _fixture(
+            "cinema.movie",
+            pk,
+            title=f"{title} {pk}",
+            description=" ".join(rng.choices(WORDS, k=20)),
+            duration=rng.randint(80, MAX_DURATION),
+            genres=rng.sample(genres, rng.randint(1, 3)),
+            actors=rng.sample(actors, min(len(actors), rng.randint(2, 6))),
+        )
+
+    movie_session_id = first_ids["cinema.moviesession"]
+    order_id = first_ids["cinema.order"]
+    ticket_id = first_ids["cinema.ticket"]
+    for day in range(options.days):
+        opening = datetime.datetime.combine(
+            options.start + datetime.timedelta(days=day), datetime.time(9)
+        )
+        for hall_id, rows, seats_in_row in halls:
+            for number in range(options.sessions_per_day):
+                show_time = opening + slot * number
+                yield _fixture(
+                    "cinema.moviesession",
+                    movie_session_id,
+                    show_time=show_time.isoformat(),
+                    movie=rng.choice(movies),
+                    cinema_hall=hall_id,
+                )
+                fill = min(1.0, max(0.0, rng.gauss(options.fill, 0.15)))
+                capacity = rows * seats_in_row
+                places = rng.sample(range(capacity), int(capacity * fill))
+                start = 0
+                while start < len(places):
+                    size = rng.randint(1, 6)
+                    booked = places[start:start + size]
+                    start += size
+                    created_at = show_time - datetime.timedelta(
+                        minutes=rng.randint(10, 14 * 24 * 60)
+                    )
+                    yield _fixture(
+                        "cinema.order",
+                        order_id,
+                        created_at=created_at.isoformat(),
+                        user=rng.choice(users),
+                    )
+                    for place in booked:
+                        row, seat = divmod(place, seats_in_row)
+                        yield _fixture(
+                            "cinema.ticket",
+                            ticket_id,
+                            movie_session=movie_session_id,
+                            order=order_id,
+                            row=row + 1,
+                            seat=seat + 1,
+                        )
+                        ticket_id += 1
+                    order_id += 1
+                movie_session_id += 1
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.conf import settings
+from django.db.models import F
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework.test import APIClient
+from cinema.models import Movie, Genre, MovieSession, Order, Ticket
+from user.models import User
+
+class BulkImportTests(TestCase):
+    fixture_path = os.path.join(settings.BASE_DIR, "cinema_service_db_data.json")
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        with open(self.fixture_path) as fixture:
+            self.objects = json.load(fixture)
+        # batches commit separately, so users have to precede their orders
+        self.objects.sort(key=lambda obj: obj["model"] != "user.user")
+
+    def write_lines(self, objects):
+        path = os.path.join(self.directory.name, "data.jsonl")
+        with open(path, "w") as file:
+            file.writelines(json.dumps(obj) + "\n" for obj in objects)
+        return path
+
+    def test_bulk_import_fixture(self):
+        out = StringIO()
+        call_command("bulk_import", self.write_lines(self.objects), "--batch-size", "10", stdout=out)
+        self.assertIn(f"Imported {len(self.objects)} objects", out.getvalue())
+        self.assertEqual(Ticket.objects.count(), 16)
+        departed = Movie.objects.get(pk=1)
+        self.assertEqual(sorted(departed.genres.values_list("id", flat=True)), [1, 2, 3])
+        self.assertEqual(Order.objects.get(pk=1).created_at.isoformat(), "2022-08-09T09:06:18.876000")
+        for movie_session in MovieSession.objects.all():
+            self.assertEqual(movie_session.tickets_sold, movie_session.tickets.count())
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(pk=1))
+        response = client.get("/api/cinema/movies/?search=departed")
+        self.assertEqual([movie["id"] for movie in response.data], [1])
+
+    def test_bulk_import_json_array(self):
+        call_command("bulk_import", self.fixture_path, stdout=StringIO())
+        self.assertEqual(Movie.objects.count(), 4)
+        self.assertEqual(Ticket.objects.count(), 16)
+
+    def test_bulk_import_csv(self):
+        path = os.path.join(self.directory.name, "genres.csv")
+        with open(path, "w") as file:
+            file.write("id,name\n1,Crime\n2,Drama\n")
+        call_command("bulk_import", path, "--model", "cinema.genre", stdout=StringIO())
+        self.assertEqual(list(Genre.objects.order_by("id").values_list("name", flat=True)), ["Crime", "Drama"])
+        self.assertEqual(Genre.objects.create(name="Horror").id, 3)
+
+    def test_bulk_import_resumes_from_checkpoint(self):
+        checkpoint = os.path.join(self.directory.name, "import.checkpoint")
+        bad_ticket = self.objects[-1]
+        bad_ticket["fields"]["row"] = 1000
+        path = self.write_lines(self.objects)
+        with self.assertRaisesMessage(CommandError, "seat (1000, "):
+            call_command("bulk_import", path, "--batch-size", "20", "--checkpoint", checkpoint, stdout=StringIO())
+        with open(checkpoint) as file:
+            committed = json.load(file)["objects"]
+        self.assertEqual(committed, 40)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+        bad_ticket["fields"]["row"] = 1
+        path = self.write_lines(self.objects)
+        out = StringIO()
+        call_command("bulk_import", path, "--batch-size", "20", "--checkpoint", checkpoint, stdout=out)
+        self.assertIn("Resuming after 40 objects", out.getvalue())
+        self.assertEqual(Ticket.objects.count(), 16)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_generate_data(self):
+        out = StringIO()
+        options = ["--halls", "2", "--movies", "3", "--actors", "4", "--users", "5", "--days", "2", "--fill", "0.5"]
+        call_command("generate_data", *options, stdout=out)
+        self.assertEqual(MovieSession.objects.count(), 2 * 2 * 4)
+        self.assertEqual(Movie.objects.filter(genres__isnull=False).distinct().count(), 3)
+        for movie_session in MovieSession.objects.select_related("cinema_hall"):
+            self.assertEqual(movie_session.tickets_sold, movie_session.tickets.count())
+            self.assertGreater(movie_session.tickets_sold, 0)
+        self.assertFalse(Ticket.objects.filter(row__gt=F("movie_session__cinema_hall__rows")).exists())
+        tickets = list(Ticket.objects.order_by("id").values_list("movie_session", "row", "seat"))
+        call_command("generate_data", *options, stdout=StringIO())
+        repeated = list(Ticket.objects.order_by("id").values_list("movie_session", "row", "seat"))[len(tickets):]
+        self.assertEqual([place[1:] for place in repeated], [place[1:] for place in tickets])
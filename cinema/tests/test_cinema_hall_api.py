@@ -1,7 +1,8 @@
+import datetime
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
-from cinema.models import CinemaHall
+from cinema.models import CinemaHall, Movie, MovieSession, Order, Ticket
 from user.models import User
 
 class CinemaHallApiTests(TestCase):
@@ -55,3 +56,51 @@ class CinemaHallApiTests(TestCase):
     def test_delete_invalid_cinema_hall(self):
         response = self.client.delete("/api/cinema/cinema_halls/1000/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_post_cinema_hall_with_layout(self):
+        layout = ["VV.VV", "SS.SS", "SSSSS"]
+        response = self.client.post(
+            "/api/cinema/cinema_halls/",
+            {"name": "Yellow", "rows": 3, "seats_in_row": 5, "layout": layout},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["layout"], layout)
+        self.assertEqual(response.data["capacity"], 13)
+        self.assertEqual(response.data["seat_categories"], {"standard": 9, "vip": 4})
+        hall = CinemaHall.objects.get(name="Yellow")
+        self.assertEqual(hall.capacity, 13)
+        self.assertEqual(hall.seat_layout.category(1, 1), "vip")
+        self.assertIsNone(hall.seat_layout.category(2, 3))
+
+    def test_post_cinema_hall_invalid_layout(self):
+        for layout in (["SSSSS"], ["SSSSS", "SSSS", "SSSSS"], ["SSSSS", "SSXSS", "SSSSS"]):
+            response = self.client.post(
+                "/api/cinema/cinema_halls/",
+                {"name": "Yellow", "rows": 3, "seats_in_row": 5, "layout": layout},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("layout", response.data)
+
+    def test_patch_cinema_hall_rows_must_match_layout(self):
+        self.client.patch("/api/cinema/cinema_halls/2/", {"layout": ["S" * 8] * 6}, format="json")
+        response = self.client.patch("/api/cinema/cinema_halls/2/", {"rows": 7}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch("/api/cinema/cinema_halls/2/", {"layout": [".SSSSSS."] * 6}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CinemaHall.objects.get(id=2).capacity, 36)
+
+    def test_patch_cinema_hall_cannot_strand_tickets(self):
+        movie = Movie.objects.create(title="Titanic", description="Titanic description", duration=123)
+        movie_session = MovieSession.objects.create(
+            movie=movie, cinema_hall_id=2, show_time=datetime.datetime(2022, 9, 2, 9)
+        )
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(movie_session=movie_session, order=order, row=6, seat=8)
+        for change in ({"rows": 5}, {"seats_in_row": 7}, {"layout": ["S" * 8] * 5 + ["S" * 7 + "."]}):
+            response = self.client.patch("/api/cinema/cinema_halls/2/", change, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, change)
+            self.assertIn("(6, 8)", str(response.data))
+        response = self.client.patch("/api/cinema/cinema_halls/2/", {"rows": 7, "name": "Big"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
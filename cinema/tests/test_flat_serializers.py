@@ -0,0 +1,58 @@
+import datetime
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from cinema.flat_serializers import FlatMovieListSerializer, FlatMovieSessionListSerializer
+from cinema.models import Movie, Genre, Actor, CinemaHall, MovieSession, Order, Ticket
+from cinema.serializers import MovieListSerializer, MovieSessionListSerializer
+from user.models import User
+
+
+class FlatSerializerParityTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="admin")
+        genres = [Genre.objects.create(name=name) for name in ("Drama", "Comedy", "Ужаси")]
+        actors = [
+            Actor.objects.create(first_name="Kate", last_name="Winslet"),
+            Actor.objects.create(first_name="Leonardo", last_name="DiCaprio"),
+        ]
+        self.movies = [
+            Movie.objects.create(title="Titanic", description="Titanic description", duration=123),
+            Movie.objects.create(title="Empty", description="", duration=0),
+            Movie.objects.create(title="Ω \"quoted\"", description="multi\nline", duration=90),
+        ]
+        self.movies[0].genres.add(*genres)
+        self.movies[0].actors.add(*actors)
+        self.movies[2].genres.add(genres[1])
+        self.movies[2].actors.add(actors[1])
+        halls = [
+            CinemaHall.objects.create(name="White", rows=10, seats_in_row=14),
+            CinemaHall.objects.create(name="Green", rows=1, seats_in_row=1),
+        ]
+        order = Order.objects.create(user=user)
+        for i in range(6):
+            session = MovieSession.objects.create(
+                movie=self.movies[i % 3],
+                cinema_hall=halls[i % 2],
+                show_time=datetime.datetime(2022, 9, 2, 9, i, i, i * 1000),
+            )
+            for seat in range(1, 4 if i % 2 == 0 else 2):
+                Ticket.objects.create(movie_session=session, order=order, row=1, seat=seat)
+
+    def assertSameJson(self, expected, actual):
+        self.assertEqual(JSONRenderer().render(expected), JSONRenderer().render(actual))
+
+    def test_movie_session_list(self):
+        queryset = MovieSession.objects.with_tickets_available().order_by("-show_time", "-id")
+        expected = MovieSessionListSerializer(queryset, many=True).data
+        actual = FlatMovieSessionListSerializer(FlatMovieSessionListSerializer.values(queryset), many=True).data
+        self.assertSameJson(expected, actual)
+
+    def test_movie_list(self):
+        queryset = Movie.objects.with_names()
+        expected = MovieListSerializer(queryset, many=True).data
+        actual = FlatMovieListSerializer(FlatMovieListSerializer.values(queryset), many=True).data
+        self.assertSameJson(expected, actual)
+
+    def test_empty_list(self):
+        self.assertEqual(FlatMovieListSerializer([], many=True).data, [])
+        self.assertEqual(FlatMovieSessionListSerializer([], many=True).data, [])
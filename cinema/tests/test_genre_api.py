@@ -1,6 +1,9 @@
+from unittest import mock
 from django.test import TestCase
+from django.utils.http import http_date
 from rest_framework.test import APIClient
 from rest_framework import status
+from cinema.caching import bump_version
 from cinema.models import Genre
 from user.models import User
 
@@ -39,3 +42,35 @@ class GenreApiTests(TestCase):
     def test_delete_invalid_genre(self):
         response = self.client.delete("/api/cinema/genres/1000/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_genres_is_cached(self):
+        first = self.client.get("/api/cinema/genres/")
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/cinema/genres/")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_get_genres_not_modified(self):
+        first = self.client.get("/api/cinema/genres/")
+        response = self.client.get("/api/cinema/genres/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get("/api/cinema/genres/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_get_genres_after_change(self):
+        first = self.client.get("/api/cinema/genres/")
+        Genre.objects.create(name="Horror")
+        response = self.client.get("/api/cinema/genres/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual(sorted(g["name"] for g in response.data), ["Comedy", "Drama", "Horror"])
+
+    def test_get_genres_last_modified_rounds_up(self):
+        with mock.patch("cinema.caching.time.time", return_value=2000000000.5):
+            bump_version(Genre)
+        response = self.client.get("/api/cinema/genres/")
+        self.assertEqual(response["Last-Modified"], http_date(2000000001))
+        response = self.client.get("/api/cinema/genres/", HTTP_IF_MODIFIED_SINCE=http_date(2000000000))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from cinema.metrics import QueryBudgetExceeded, registry
+from cinema.models import Genre
+from user.models import User
+
+class MetricsApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = APIClient()
+        self.user = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        Genre.objects.create(name="Comedy")
+
+    def test_get_metrics_requires_staff(self):
+        self.client.force_authenticate(user=User.objects.create(username="user"))
+        response = self.client.get("/api/cinema/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_get_metrics_per_view(self):
+        self.client.get("/api/cinema/genres/")
+        self.client.get("/api/cinema/genres/")
+        response = self.client.get("/api/cinema/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        genres = response.data["GenreViewSet.list"]
+        self.assertEqual(genres["requests"], 2)
+        # the second request is answered from the response cache
+        self.assertEqual(genres["queries"]["max"], 1)
+        self.assertEqual(sum(genres["latency_ms"]["histogram"].values()), 2)
+        self.assertIn("serializer_ms", genres)
+        self.assertIn("db_ms", genres)
+
+    async def test_get_metrics_counts_async_view_queries(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        await client.get("/api/cinema/async/movie_sessions/")
+        view = registry.snapshot()["async_views.movie_session_list"]
+        # session, user and movie session page
+        self.assertEqual(view["queries"]["max"], 3)
+
+    @override_settings(CINEMA_QUERY_BUDGETS={"GenreViewSet.list": 0})
+    def test_query_budget_is_enforced(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "GenreViewSet.list ran 1 queries, its budget is 0"):
+            self.client.get("/api/cinema/genres/")
+
+    @override_settings(CINEMA_QUERY_BUDGETS={"GenreViewSet.list": 0}, CINEMA_ENFORCE_QUERY_BUDGETS=False)
+    def test_query_budget_logs_when_not_enforced(self):
+        with self.assertLogs("cinema.metrics", "WARNING"):
+            response = self.client.get("/api/cinema/genres/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -1,7 +1,12 @@
+from io import StringIO
+from django.db import connection
+from django.core.management import call_command
+from unittest import mock, skipUnless
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
 from cinema.models import Movie, Genre, Actor
+from cinema.search import LikeSearchBackend, SearchBackend
 from user.models import User
 
 class MovieApiTests(TestCase):
@@ -16,6 +21,16 @@ class MovieApiTests(TestCase):
         self.movie.genres.add(self.drama, self.comedy)
         self.movie.actors.add(self.actress)
 
+    @skipUnless(connection.vendor == "postgresql", "JSONB_AGG is PostgreSQL only")
+    def test_with_names_on_postgresql(self):
+        empty = Movie.objects.create(title="Empty", description="", duration=90)
+        names = {
+            movie.id: (movie.genre_names, movie.actor_names)
+            for movie in Movie.objects.with_names()
+        }
+        self.assertEqual(names[self.movie.id], (["Drama", "Comedy"], ["Kate Winslet"]))
+        self.assertEqual(names[empty.id], ([], []))
+
     def test_get_movies(self):
         response = self.client.get("/api/cinema/movies/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -85,3 +100,85 @@ class MovieApiTests(TestCase):
     def test_delete_invalid_movie(self):
         response = self.client.delete("/api/cinema/movies/1000/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def search(self, query):
+        response = self.client.get("/api/cinema/movies/", {"search": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [movie["title"] for movie in response.data]
+
+    def test_search_movies(self):
+        self.assertEqual(self.search("titan"), ["Titanic"])
+        self.assertEqual(self.search("winslet"), ["Titanic"])
+        self.assertEqual(self.search("comedy"), ["Titanic"])
+        self.assertEqual(self.search("kate drama"), ["Titanic"])
+        self.assertEqual(self.search("superman"), [])
+
+    def test_search_movies_ranks_title_matches_first(self):
+        Movie.objects.create(title="Iceberg", description="Not quite Titanic", duration=90)
+        self.assertEqual(self.search("titanic"), ["Titanic", "Iceberg"])
+
+    def test_search_movies_follows_changes(self):
+        self.actress.last_name = "Bates"
+        self.actress.save()
+        self.assertEqual(self.search("winslet"), [])
+        self.assertEqual(self.search("bates"), ["Titanic"])
+        self.movie.genres.remove(self.comedy)
+        self.assertEqual(self.search("comedy"), [])
+        self.drama.delete()
+        self.assertEqual(self.search("drama"), [])
+        self.movie.delete()
+        self.assertEqual(self.search("titanic"), [])
+
+    def test_search_movies_with_filters(self):
+        other = Movie.objects.create(title="Titanic II", description="Sequel", duration=90)
+        self.assertCountEqual(self.search("titanic"), ["Titanic", "Titanic II"])
+        response = self.client.get("/api/cinema/movies/", {"search": "titanic", "genres": self.drama.id})
+        self.assertEqual([movie["id"] for movie in response.data], [self.movie.id])
+        self.assertNotEqual(other.id, self.movie.id)
+
+    def test_search_movies_with_filters_beyond_max_results(self):
+        iceberg = Movie.objects.create(title="Iceberg", description="Not quite Titanic", duration=90)
+        iceberg.genres.add(self.comedy)
+        self.movie.genres.remove(self.comedy)
+        with mock.patch("cinema.search.SearchBackend.max_results", 1):
+            self.assertEqual(self.search("titanic"), ["Titanic"])
+            response = self.client.get("/api/cinema/movies/", {"search": "titanic", "genres": self.comedy.id})
+        self.assertEqual([movie["id"] for movie in response.data], [iceberg.id])
+
+    def test_search_backends_rank_ids(self):
+        with self.assertRaises(TypeError):
+            SearchBackend()
+        Movie.objects.create(title="Iceberg", description="", duration=90)
+        candidates = Movie.objects.values("id")
+        self.assertEqual(LikeSearchBackend().ranked_ids(["titanic"], candidates), [self.movie.id])
+
+    def test_rebuild_search_index(self):
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 1 movies", out.getvalue())
+        self.assertEqual(self.search("titanic"), ["Titanic"])
+
+    def test_get_movies_cache_follows_related_changes(self):
+        self.client.get("/api/cinema/movies/")
+        self.actress.first_name = "Kathy"
+        self.actress.save()
+        response = self.client.get("/api/cinema/movies/")
+        self.assertEqual(response.data[0]["actors"], ["Kathy Winslet"])
+        self.movie.genres.remove(self.comedy)
+        response = self.client.get("/api/cinema/movies/")
+        self.assertEqual(response.data[0]["genres"], ["Drama"])
+
+    def test_get_movies_query_count_is_constant(self):
+        for i in range(10):
+            movie = Movie.objects.create(title=f"Movie {i}", description="", duration=90)
+            movie.genres.add(self.drama)
+            movie.actors.add(self.actress)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/cinema/movies/")
+        self.assertEqual(len(response.data), 11)
+        self.assertEqual(response.data[0]["genres"], ["Drama"])
+        self.assertEqual(response.data[0]["actors"], ["Kate Winslet"])
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/cinema/movies/?genres={self.comedy.id}")
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["genres"], ["Drama", "Comedy"])
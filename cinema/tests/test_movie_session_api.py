@@ -1,12 +1,23 @@
 import datetime
-from django.test import TestCase
+import json
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
-from cinema.models import Movie, Genre, Actor, CinemaHall, MovieSession
+import base64
+from cinema.models import Movie, Genre, Actor, CinemaHall, MovieSession, Order, SeatHold, Ticket
+from cinema.seat_events import get_seat_event_broker
+from cinema.seat_map import SeatMap, find_best_seats
 from user.models import User
 
 class MovieSessionApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = User.objects.create(username="admin")
         self.client.force_authenticate(user=self.user)
@@ -26,22 +37,22 @@ class MovieSessionApiTests(TestCase):
     def test_get_movie_sessions(self):
         response = self.client.get("/api/cinema/movie_sessions/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["movie_title"], "Titanic")
+        self.assertEqual(response.data["results"][0]["movie_title"], "Titanic")
 
     def test_get_movie_sessions_filtered_by_date(self):
         response = self.client.get("/api/cinema/movie_sessions/?date=2022-09-02")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_get_movie_sessions_filtered_by_movie(self):
         response = self.client.get(f"/api/cinema/movie_sessions/?movie={self.movie.id}")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_get_movie_sessions_filtered_by_movie_and_date(self):
         response = self.client.get(f"/api/cinema/movie_sessions/?movie={self.movie.id}&date=2022-09-02")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_post_movie_session(self):
         response = self.client.post("/api/cinema/movie_sessions/", {
@@ -51,7 +62,507 @@ class MovieSessionApiTests(TestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_post_movie_session_overlapping_in_same_hall(self):
+        data = {"movie": self.movie.id, "cinema_hall": self.cinema_hall.id, "show_time": "2022-09-02T11:00:00"}
+        response = self.client.post("/api/cinema/movie_sessions/", data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f"Overlaps movie session {self.movie_session.id}", response.data["show_time"][0])
+        other_hall = CinemaHall.objects.create(name="Red", rows=5, seats_in_row=5)
+        response = self.client.post("/api/cinema/movie_sessions/", {**data, "cinema_hall": other_hall.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post("/api/cinema/movie_sessions/", {**data, "show_time": "2022-09-02T11:03:00"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            MovieSession.objects.get(id=response.data["id"]).end_time, datetime.datetime(2022, 9, 2, 13, 6)
+        )
+
+    def test_put_movie_session_does_not_overlap_itself(self):
+        response = self.client.put(f"/api/cinema/movie_sessions/{self.movie_session.id}/", {
+            "movie": self.movie.id,
+            "cinema_hall": self.cinema_hall.id,
+            "show_time": "2022-09-02T10:00:00",
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.movie_session.refresh_from_db()
+        self.assertEqual(self.movie_session.end_time, datetime.datetime(2022, 9, 2, 12, 3))
+
+    def test_movie_duration_change_moves_end_times(self):
+        self.movie.duration = 60
+        self.movie.save()
+        self.movie_session.refresh_from_db()
+        self.assertEqual(self.movie_session.end_time, datetime.datetime(2022, 9, 2, 10))
+
+    def test_movie_save_without_duration_change_keeps_end_times(self):
+        self.movie.title = "Titanic 3D"
+        with CaptureQueriesContext(connection) as queries:
+            self.movie.save()
+        self.assertFalse([query for query in queries if "UPDATE \"cinema_moviesession\"" in query["sql"]])
+
+    def test_movie_duration_change_rejected_when_sessions_would_overlap(self):
+        other = Movie.objects.create(title="Other", description="Other", duration=60)
+        later = MovieSession.objects.create(
+            movie=other, cinema_hall=self.cinema_hall, show_time=datetime.datetime(2022, 9, 2, 11, 30)
+        )
+        path = f"/api/cinema/movies/{self.movie.id}/"
+        response = self.client.patch(path, {"duration": 180}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["duration"],
+            [f"movie session {self.movie_session.id} overlaps movie session {later.id} "
+             f"in cinema hall {self.cinema_hall.id}."],
+        )
+        self.movie_session.refresh_from_db()
+        self.assertEqual(self.movie_session.end_time, datetime.datetime(2022, 9, 2, 11, 3))
+        response = self.client.patch(path, {"duration": 140}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.movie_session.refresh_from_db()
+        self.assertEqual(self.movie_session.end_time, datetime.datetime(2022, 9, 2, 11, 20))
+
+    def schedule(self, *show_times, cinema_hall=None):
+        return self.client.post(
+            "/api/cinema/movie_sessions/schedule/",
+            {
+                "sessions": [
+                    {"movie": self.movie.id, "cinema_hall": (cinema_hall or self.cinema_hall).id, "show_time": show_time}
+                    for show_time in show_times
+                ]
+            },
+            format="json",
+        )
+
+    def test_post_schedule_creates_sessions(self):
+        self.assertEqual(self.schedule("2022-09-03T09:00:00").status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        show_times = [f"2022-09-{day:02}T{hour}:00:00" for day in range(3, 10) for hour in (10, 13, 16, 19)]
+        with self.assertNumQueries(4):
+            response = self.schedule(*show_times)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 28)
+        self.assertEqual(MovieSession.objects.filter(show_time__date__gte="2022-09-03").count(), 28)
+        self.assertFalse(MovieSession.objects.filter(end_time__isnull=True).exists())
+
+    def test_post_schedule_rejects_overlaps(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.schedule("2022-09-02T10:00:00", "2022-09-02T12:30:00", "2022-09-02T14:00:00")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["sessions"],
+            [
+                f"Session 1 overlaps movie session {self.movie_session.id} in cinema hall {self.cinema_hall.id}.",
+                f"Session 2 overlaps Session 3 in cinema hall {self.cinema_hall.id}.",
+            ],
+        )
+        self.assertEqual(MovieSession.objects.count(), 1)
+
     def test_get_movie_session(self):
         response = self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["movie"]["title"], "Titanic")
+
+    def test_get_movie_sessions_query_count_is_constant(self):
+        for hour in range(10, 20):
+            MovieSession.objects.create(
+                movie=self.movie,
+                cinema_hall=self.cinema_hall,
+                show_time=datetime.datetime(2022, 9, 2, hour)
+            )
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/cinema/movie_sessions/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 11)
+        self.assertEqual(response.data["results"][0]["tickets_available"], self.cinema_hall.capacity)
+
+    def test_get_movie_session_taken_places_follow_tickets(self):
+        url = f"/api/cinema/movie_sessions/{self.movie_session.id}/"
+        self.assertEqual(self.client.get(url).data["taken_places"], [])
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 3, "seat": 5, "movie_session": self.movie_session.id},
+                         {"row": 1, "seat": 14, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.client.get(url).data["taken_places"],
+            [{"row": 1, "seat": 14}, {"row": 3, "seat": 5}],
+        )
+        Ticket.objects.get(row=3, seat=5).delete()
+        self.assertEqual(self.client.get(url).data["taken_places"], [{"row": 1, "seat": 14}])
+
+    def test_get_movie_session_seat_map_bitmap(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(movie_session=self.movie_session, order=order, row=1, seat=1)
+        Ticket.objects.create(movie_session=self.movie_session, order=order, row=10, seat=14)
+        response = self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/?seat_map=bitmap")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seat_map = response.data["seat_map"]
+        self.assertEqual([seat_map["rows"], seat_map["seats_in_row"]], [10, 14])
+        bitmap = base64.b64decode(seat_map["bitmap"])
+        self.assertEqual(len(bitmap), 18)
+        self.assertEqual(bitmap[0], 0x80)
+        self.assertEqual(bitmap[17], 0x10)
+        self.assertNotIn("seat_map", self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/").data)
+
+    def test_get_movie_session_taken_places_is_cached(self):
+        url = f"/api/cinema/movie_sessions/{self.movie_session.id}/"
+        self.client.get(url)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def hold(self, *seats):
+        return self.client.post(
+            f"/api/cinema/movie_sessions/{self.movie_session.id}/holds/",
+            {"seats": [{"row": row, "seat": seat} for row, seat in seats]},
+            format="json",
+        )
+
+    def test_post_holds_takes_seats(self):
+        response = self.hold((1, 1), (1, 2))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 2)
+        self.assertIn("expires_at", response.data[0])
+        detail = self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/")
+        self.assertEqual(detail.data["taken_places"], [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}])
+        sessions = self.client.get("/api/cinema/movie_sessions/")
+        self.assertEqual(sessions.data["results"][0]["tickets_available"], self.cinema_hall.capacity - 2)
+
+    def test_post_holds_invalid_seat(self):
+        response = self.hold((11, 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_held_seat_conflicts_for_other_users(self):
+        self.hold((1, 1))
+        other = User.objects.create(username="other")
+        self.client.force_authenticate(user=other)
+        response = self.hold((1, 1), (1, 2))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["conflicts"], [{"movie_session": self.movie_session.id, "row": 1, "seat": 1}])
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 1, "seat": 1, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_order_converts_own_holds_to_tickets(self):
+        self.hold((1, 1), (1, 2))
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 1, "seat": 1, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(SeatHold.objects.values_list("row", "seat")), [(1, 2)])
+        sessions = self.client.get("/api/cinema/movie_sessions/")
+        self.assertEqual(sessions.data["results"][0]["tickets_available"], self.cinema_hall.capacity - 2)
+
+    def test_delete_holds_releases_seats(self):
+        self.hold((1, 1))
+        response = self.client.delete(f"/api/cinema/movie_sessions/{self.movie_session.id}/holds/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        detail = self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/")
+        self.assertEqual(detail.data["taken_places"], [])
+
+    def test_expired_holds_are_ignored_and_swept(self):
+        self.hold((1, 1))
+        SeatHold.objects.update(expires_at=datetime.datetime.now() - datetime.timedelta(seconds=1))
+        cache.clear()
+        sessions = self.client.get("/api/cinema/movie_sessions/")
+        self.assertEqual(sessions.data["results"][0]["tickets_available"], self.cinema_hall.capacity)
+        other = User.objects.create(username="other")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.hold((1, 1)).status_code, status.HTTP_201_CREATED)
+        SeatHold.objects.update(expires_at=datetime.datetime.now() - datetime.timedelta(seconds=1))
+        out = StringIO()
+        call_command("expire_seat_holds", stdout=out)
+        self.assertIn("Deleted 1 expired seat holds", out.getvalue())
+        self.assertFalse(SeatHold.objects.exists())
+
+    def best_seats(self, count):
+        return self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/best_seats/?count={count}")
+
+    def test_get_best_seats_prefers_centre_and_skips_taken(self):
+        response = self.best_seats(3)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["seats"], [{"row": 5, "seat": seat} for seat in (7, 8, 9)])
+        self.hold((5, 8))
+        response = self.best_seats(3)
+        self.assertEqual(response.data["seats"], [{"row": 6, "seat": seat} for seat in (7, 8, 9)])
+        self.assertFalse(SeatHold.objects.filter(row=6).exists())
+
+    def test_get_best_seats_invalid_count(self):
+        for count in (0, 15, "many"):
+            self.assertEqual(self.best_seats(count).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_best_seats_holds_them(self):
+        response = self.client.post(
+            f"/api/cinema/movie_sessions/{self.movie_session.id}/best_seats/", {"count": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([(hold["row"], hold["seat"]) for hold in response.data], [(5, 7), (5, 8)])
+        self.assertEqual(
+            list(SeatHold.objects.filter(user=self.user).order_by("seat").values_list("row", "seat")),
+            [(5, 7), (5, 8)],
+        )
+        detail = self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/")
+        self.assertEqual(detail.data["taken_places"], [{"row": 5, "seat": 7}, {"row": 5, "seat": 8}])
+
+    def test_post_best_seats_conflicts_when_no_row_fits(self):
+        self.hold(*((row, 7) for row in range(1, 11)))
+        self.assertEqual(self.best_seats(8).data["seats"], [])
+        response = self.client.post(
+            f"/api/cinema/movie_sessions/{self.movie_session.id}/best_seats/", {"count": 8}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(SeatHold.objects.count(), 10)
+
+    def test_blocked_seats_are_not_for_sale(self):
+        self.cinema_hall.layout = ["S" * 6 + ".." + "S" * 6] * 10
+        self.cinema_hall.save()
+        self.assertEqual(self.hold((1, 7)).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 1, "seat": 8, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.best_seats(2).data["seats"], [{"row": 5, "seat": 5}, {"row": 5, "seat": 6}])
+        sessions = self.client.get("/api/cinema/movie_sessions/")
+        self.assertEqual(sessions.data["results"][0]["cinema_hall_capacity"], 120)
+        self.assertEqual(sessions.data["results"][0]["tickets_available"], 120)
+
+    def test_get_movie_session_skips_places_outside_resized_hall(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(movie_session=self.movie_session, order=order, row=9, seat=9)
+        Ticket.objects.create(movie_session=self.movie_session, order=order, row=1, seat=2)
+        path = f"/api/cinema/movie_sessions/{self.movie_session.id}/"
+        for resize in ({"rows": 5}, {"seats_in_row": 5}):
+            CinemaHall.objects.filter(id=self.cinema_hall.id).update(**{"rows": 10, "seats_in_row": 14, **resize})
+            with self.assertLogs("cinema.seat_map", "WARNING"):
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["taken_places"], [{"row": 1, "seat": 2}])
+
+    def test_get_movie_session_seats_available_per_category(self):
+        self.cinema_hall.layout = ["V" * 14] + ["S" * 6 + ".." + "S" * 6] * 9
+        self.cinema_hall.save()
+        self.hold((1, 1), (2, 1))
+        response = self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/")
+        self.assertEqual(response.data["cinema_hall"]["seat_categories"], {"standard": 108, "vip": 14})
+        self.assertEqual(response.data["seats_available"], {"standard": 107, "vip": 13})
+
+    def test_find_best_seats_in_fragmented_large_hall(self):
+        # timed by benchmarks/seat_finder.py
+        seat_map = SeatMap(50, 60)
+        for row in range(1, 51):
+            for seat in range(1, 61, 3):
+                seat_map.take(row, seat)
+        self.assertEqual(find_best_seats(seat_map, 2), [(25, 29), (25, 30)])
+        self.assertEqual(find_best_seats(seat_map, 3), [])
+
+    def test_get_movie_sessions_cursor_pagination(self):
+        for hour in range(10, 15):
+            MovieSession.objects.create(
+                movie=self.movie,
+                cinema_hall=self.cinema_hall,
+                show_time=datetime.datetime(2022, 9, 2, 12)
+            )
+        expected = list(MovieSession.objects.order_by("-show_time", "-id").values_list("id", flat=True))
+        first = self.client.get("/api/cinema/movie_sessions/?page_size=4")
+        self.assertIsNone(first.data["previous"])
+        with self.assertNumQueries(1):
+            second = self.client.get(first.data["next"])
+        self.assertIsNone(second.data["next"])
+        ids = [session["id"] for session in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, expected)
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.assertIsNone(back.data["previous"])
+
+    def test_get_movie_sessions_by_date_served_from_day_schedule(self):
+        path = "/api/cinema/movie_sessions/?date=2022-09-02"
+        first = self.client.get(path)
+        with self.assertNumQueries(0):
+            second = self.client.get(path)
+        self.assertEqual(second.data, first.data)
+        self.hold((1, 1))
+        response = self.client.get(path)
+        self.assertEqual(response.data["results"][0]["tickets_available"], self.cinema_hall.capacity - 1)
+        self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 2, "seat": 1, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        response = self.client.get(path)
+        self.assertEqual(response.data["results"][0]["tickets_available"], self.cinema_hall.capacity - 2)
+        later = MovieSession.objects.create(
+            movie=self.movie, cinema_hall=self.cinema_hall, show_time=datetime.datetime(2022, 9, 2, 20)
+        )
+        response = self.client.get(path)
+        self.assertEqual([session["id"] for session in response.data["results"]], [later.id, self.movie_session.id])
+        self.cinema_hall.name = "Black"
+        self.cinema_hall.save()
+        response = self.client.get(path)
+        self.assertEqual(response.data["results"][0]["cinema_hall_name"], "Black")
+
+    def test_get_movie_sessions_by_date_and_movie_from_day_schedule(self):
+        other = Movie.objects.create(title="Other", description="Other", duration=90)
+        MovieSession.objects.create(movie=other, cinema_hall=self.cinema_hall, show_time=datetime.datetime(2022, 9, 2, 20))
+        self.client.get("/api/cinema/movie_sessions/?date=2022-09-02")
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/api/cinema/movie_sessions/?date=2022-09-02&movie={self.movie.id}")
+        self.assertEqual([session["id"] for session in response.data["results"]], [self.movie_session.id])
+        response = self.client.get(f"/api/cinema/movie_sessions/?date=2030-01-01&movie={self.movie.id}")
+        self.assertEqual(response.data["results"], [])
+
+    def test_get_movie_sessions_by_date_and_invalid_movie(self):
+        for movie in ("\u00b2", "abc", "999", "-1"):
+            response = self.client.get(f"/api/cinema/movie_sessions/?date=2022-09-02&movie={movie}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("movie", response.data)
+
+    def test_get_movie_sessions_by_date_cursor_pagination(self):
+        for minute in range(5):
+            MovieSession.objects.create(
+                movie=self.movie,
+                cinema_hall=self.cinema_hall,
+                show_time=datetime.datetime(2022, 9, 2, 12, minute * 10)
+            )
+            MovieSession.objects.create(
+                movie=self.movie,
+                cinema_hall=self.cinema_hall,
+                show_time=datetime.datetime(2022, 9, 2, 12, minute * 10)
+            )
+        expected = list(MovieSession.objects.order_by("-show_time", "-id").values_list("id", flat=True))
+        ids = []
+        path = "/api/cinema/movie_sessions/?date=2022-09-02&page_size=3"
+        pages = []
+        while path:
+            pages.append(self.client.get(path).data)
+            ids += [session["id"] for session in pages[-1]["results"]]
+            path = pages[-1]["next"]
+        self.assertEqual(ids, expected)
+        back = self.client.get(pages[-1]["previous"])
+        self.assertEqual(back.data["results"], pages[-2]["results"])
+
+    def test_get_movie_sessions_invalid_cursor(self):
+        response = self.client.get("/api/cinema/movie_sessions/?cursor=garbage")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_movie_sessions_tampered_cursor(self):
+        for position in (["soon", 1], ["2022-09-02 12:00:00", "one"], [None, 1], [[1], 1], [1, 2 ** 70]):
+            cursor = base64.urlsafe_b64encode(json.dumps({"p": position, "r": 0}).encode()).decode()
+            for path in ("/api/cinema/movie_sessions/", "/api/cinema/movie_sessions/?date=2022-09-02&"):
+                separator = "" if path.endswith("&") else "?"
+                response = self.client.get(f"{path}{separator}cursor={cursor}")
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, (path, position))
+
+    def test_get_movie_sessions_filtered_by_invalid_date(self):
+        response = self.client.get("/api/cinema/movie_sessions/?date=02.09.2022")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_movie_sessions_filtered_by_date_excludes_next_midnight(self):
+        MovieSession.objects.create(
+            movie=self.movie,
+            cinema_hall=self.cinema_hall,
+            show_time=datetime.datetime(2022, 9, 3)
+        )
+        response = self.client.get("/api/cinema/movie_sessions/?date=2022-09-02")
+        self.assertEqual([session["id"] for session in response.data["results"]], [self.movie_session.id])
+
+    async def test_async_movie_sessions_match_sync(self):
+        order = await Order.objects.acreate(user=self.user)
+        await Ticket.objects.abulk_create([Ticket(movie_session=self.movie_session, order=order, row=2, seat=3)])
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        for path in (
+            "/api/cinema/{}movie_sessions/",
+            "/api/cinema/{}movie_sessions/?date=2022-09-02",
+            f"/api/cinema/{{}}movie_sessions/?movie={self.movie.id}",
+            f"/api/cinema/{{}}movie_sessions/{self.movie_session.id}/",
+            f"/api/cinema/{{}}movie_sessions/{self.movie_session.id}/?seat_map=bitmap",
+        ):
+            expected = await client.get(path.format(""))
+            response = await client.get(path.format("async/"))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json(), expected.json())
+
+    async def test_async_movie_sessions_errors(self):
+        client = AsyncClient()
+        response = await client.get("/api/cinema/async/movie_sessions/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        await client.aforce_login(self.user)
+        response = await client.get("/api/cinema/async/movie_sessions/1000/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await client.get("/api/cinema/async/movie_sessions/?date=tomorrow")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for query in ("movie=999", "movie=999&date=2030-01-01"):
+            response = await client.get(f"/api/cinema/async/movie_sessions/?{query}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_movie_sessions_basic_auth_and_methods(self):
+        self.user.set_password("secret")
+        await self.user.asave()
+        client = AsyncClient()
+        path = f"/api/cinema/async/movie_sessions/{self.movie_session.id}/"
+        credentials = base64.b64encode(b"admin:secret").decode()
+        response = await client.get(path, headers={"authorization": f"Basic {credentials}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        credentials = base64.b64encode(b"admin:wrong").decode()
+        response = await client.get(path, headers={"authorization": f"Basic {credentials}"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        await client.aforce_login(self.user)
+        response = await client.post(path)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_seat_changes_are_published_on_commit(self):
+        with mock.patch.object(get_seat_event_broker(), "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    "/api/cinema/orders/",
+                    {"tickets": [
+                        {"row": 1, "seat": 1, "movie_session": self.movie_session.id},
+                        {"row": 1, "seat": 2, "movie_session": self.movie_session.id},
+                    ]},
+                    format="json",
+                )
+                self.hold((2, 1))
+                self.client.delete(f"/api/cinema/movie_sessions/{self.movie_session.id}/holds/")
+                Ticket.objects.get(row=1, seat=2).delete()
+        self.assertEqual(
+            [call.args for call in publish.call_args_list],
+            [
+                (self.movie_session.id, {"taken": [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}], "released": []}),
+                (self.movie_session.id, {"taken": [{"row": 2, "seat": 1}], "released": []}),
+                (self.movie_session.id, {"taken": [], "released": [{"row": 2, "seat": 1}]}),
+                (self.movie_session.id, {"taken": [], "released": [{"row": 1, "seat": 2}]}),
+            ],
+        )
+
+    def test_seat_events_need_asgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f"/api/cinema/async/movie_sessions/{self.movie_session.id}/seat_events/")
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+        self.assertFalse(response.streaming)
+
+    async def test_seat_events_stream(self):
+        order = await Order.objects.acreate(user=self.user)
+        await Ticket.objects.abulk_create([Ticket(movie_session=self.movie_session, order=order, row=2, seat=3)])
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(f"/api/cinema/async/movie_sessions/{self.movie_session.id}/seat_events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+        snapshot = (await anext(events)).decode()
+        self.assertEqual(
+            snapshot,
+            "event: snapshot\ndata: " + json.dumps({"taken_places": [{"row": 2, "seat": 3}]}) + "\n\n",
+        )
+        delta = {"taken": [{"row": 1, "seat": 1}], "released": []}
+        get_seat_event_broker().publish(self.movie_session.id, delta)
+        self.assertEqual((await anext(events)).decode(), f"event: seats\ndata: {json.dumps(delta)}\n\n")
+        await events.aclose()
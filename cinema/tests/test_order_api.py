@@ -1,12 +1,23 @@
+import base64
+import csv
+import json
+import threading
+from io import StringIO
+import time
 from datetime import datetime
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from rest_framework.test import APIClient
 from rest_framework import status
+from cinema.booking import reconcile_tickets_sold
 from cinema.models import Movie, Genre, Actor, CinemaHall, MovieSession, Ticket, Order
 from user.models import User
 
 class OrderApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = User.objects.create(username="admin")
         self.client.force_authenticate(user=self.user)
@@ -24,9 +35,22 @@ class OrderApiTests(TestCase):
     def test_get_order(self):
         response = self.client.get("/api/cinema/orders/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["tickets"][0]["row"], 2)
-        self.assertEqual(response.data[0]["tickets"][0]["seat"], 12)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["tickets"][0]["row"], 2)
+        self.assertEqual(response.data["results"][0]["tickets"][0]["seat"], 12)
+
+    def test_get_orders_with_session_login_within_query_budget(self):
+        client = APIClient()
+        client.force_login(self.user)
+        # budgets are enforced under test, so an overrun raises
+        response = client.get("/api/cinema/orders/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"][0]["tickets"]), 1)
+
+    def test_get_order_tampered_cursor(self):
+        cursor = base64.urlsafe_b64encode(json.dumps({"p": ["yesterday", 1], "r": 0}).encode()).decode()
+        response = self.client.get(f"/api/cinema/orders/?cursor={cursor}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_movie_session_detail_tickets(self):
         response = self.client.get(f"/api/cinema/movie_sessions/{self.movie_session.id}/")
@@ -37,4 +61,298 @@ class OrderApiTests(TestCase):
     def test_movie_session_list_tickets_available(self):
         response = self.client.get("/api/cinema/movie_sessions/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["tickets_available"], self.cinema_hall.capacity - 1)
+        self.assertEqual(response.data["results"][0]["tickets_available"], self.cinema_hall.capacity - 1)
+
+    def test_get_order_query_count_is_constant(self):
+        sessions = [self.movie_session] + [
+            MovieSession.objects.create(movie=self.movie, cinema_hall=self.cinema_hall, show_time=datetime.now())
+            for _ in range(4)
+        ]
+        orders = Order.objects.bulk_create([Order(user=self.user) for _ in range(300)])
+        Ticket.objects.bulk_create([
+            Ticket(order=order, movie_session=sessions[i % len(sessions)], row=i // 5 // 14 + 5, seat=i // 5 % 14 + 1)
+            for i, order in enumerate(orders)
+        ])
+        list(reconcile_tickets_sold())
+        pages = []
+        url = "/api/cinema/orders/?page_size=100"
+        while url:
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data["results"])
+            url = response.data["next"]
+        self.assertEqual([len(page) for page in pages], [100, 100, 100, 1])
+        results = [order for page in pages for order in page]
+        self.assertEqual(len({order["id"] for order in results}), 301)
+        available = {
+            ticket["movie_session"]["id"]: ticket["movie_session"]["tickets_available"]
+            for order in results for ticket in order["tickets"]
+        }
+        for session in sessions:
+            self.assertEqual(available[session.id], self.cinema_hall.capacity - session.tickets.count())
+
+    def test_post_order(self):
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 1, "seat": 1, "movie_session": self.movie_session.id},
+                         {"row": 1, "seat": 2, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=response.data["id"])
+        self.assertEqual(sorted(order.tickets.values_list("row", "seat")), [(1, 1), (1, 2)])
+
+    def test_post_order_query_count_is_constant(self):
+        tickets = [
+            {"row": row, "seat": seat, "movie_session": self.movie_session.id}
+            for row in range(3, 11) for seat in range(1, 15)
+        ]
+        with self.assertNumQueries(9):
+            response = self.client.post("/api/cinema/orders/", {"tickets": tickets}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ticket.objects.filter(order_id=response.data["id"]).count(), len(tickets))
+
+    def test_post_order_seat_out_of_range(self):
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 11, "seat": 1, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_post_order_seat_taken(self):
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 2, "seat": 11, "movie_session": self.movie_session.id},
+                         {"row": 2, "seat": 12, "movie_session": self.movie_session.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["conflicts"],
+            [{"movie_session": self.movie_session.id, "row": 2, "seat": 12}],
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_post_order_duplicate_seats(self):
+        ticket = {"row": 1, "seat": 1, "movie_session": self.movie_session.id}
+        response = self.client.post("/api/cinema/orders/", {"tickets": [ticket, ticket]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def post_idempotent(self, key, *seats):
+        return self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": row, "seat": seat, "movie_session": self.movie_session.id} for row, seat in seats]},
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_post_order_idempotency_key_replays(self):
+        first = self.post_idempotent("retry-1", (1, 1), (1, 2))
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", first)
+        with self.assertNumQueries(1):
+            replay = self.post_idempotent("retry-1", (1, 1), (1, 2))
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(Ticket.objects.filter(order_id=first.data["id"]).count(), 2)
+
+    def test_post_order_idempotency_key_reused_for_other_request(self):
+        self.post_idempotent("retry-1", (1, 1))
+        response = self.post_idempotent("retry-1", (1, 3))
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(Ticket.objects.filter(row=1, seat=3).exists())
+        other = User.objects.create(username="other")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.post_idempotent("retry-1", (1, 3)).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post_idempotent("", (1, 4)).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expire_idempotency_keys(self):
+        first = self.post_idempotent("retry-1", (1, 1))
+        self.post_idempotent("retry-2", (1, 2))
+        Order.objects.filter(id=first.data["id"]).update(created_at=datetime(2020, 1, 1))
+        out = StringIO()
+        call_command("expire_idempotency_keys", stdout=out)
+        self.assertIn("Expired 1 idempotency keys", out.getvalue())
+        self.assertEqual(
+            sorted(Order.objects.exclude(idempotency_key=None).values_list("idempotency_key", flat=True)),
+            ["retry-2"],
+        )
+        response = self.post_idempotent("retry-1", (1, 3))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(response.data["id"], first.data["id"])
+
+    def export(self, query=""):
+        if not self.user.is_staff:
+            self.user.is_staff = True
+            self.user.save()
+        response = self.client.get(f"/api/cinema/orders/export/{query}")
+        content = b"".join(response.streaming_content).decode() if response.streaming else None
+        return response, content
+
+    def test_export_requires_staff(self):
+        response = self.client.get("/api/cinema/orders/export/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_csv(self):
+        other = Order.objects.create(user=self.user)
+        Ticket.objects.create(movie_session=self.movie_session, row=3, seat=1, order=other)
+        self.export()
+        with self.assertNumQueries(1):
+            response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([(row["order_id"], row["row"], row["seat"]) for row in rows], [
+            (str(self.order.id), "2", "12"),
+            (str(other.id), "3", "1"),
+        ])
+        self.assertEqual(rows[0]["movie_title"], "Titanic")
+        self.assertEqual(rows[0]["cinema_hall_name"], "White")
+
+    def test_export_ndjson_filtered_by_created_at(self):
+        old = Order.objects.create(user=self.user)
+        Order.objects.filter(id=old.id).update(created_at=datetime(2020, 1, 1, 23, 59))
+        Ticket.objects.create(movie_session=self.movie_session, row=3, seat=1, order=old)
+        response, content = self.export("?output=ndjson&created_after=2019-12-31&created_before=2020-01-01")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(row["order_id"], row["row"], row["seat"]) for row in rows], [(old.id, 3, 1)])
+        response, content = self.export("?created_after=2020-01-02&output=ndjson")
+        self.assertEqual([json.loads(line)["order_id"] for line in content.splitlines()], [self.order.id])
+
+    def test_export_invalid_parameters(self):
+        self.assertEqual(self.export("?output=xml")[0].status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.export("?created_after=yesterday")[0].status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_orders_command(self):
+        out = StringIO()
+        call_command("export_orders", "--format", "ndjson", "--chunk-size", "1", stdout=out)
+        row = json.loads(out.getvalue())
+        self.assertEqual((row["ticket_id"], row["user_id"]), (self.ticket.id, self.user.id))
+
+
+class OrderConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create(username=f"buyer{i}") for i in range(8)]
+        movie = Movie.objects.create(title="Titanic", description="Titanic description", duration=123)
+        cinema_hall = CinemaHall.objects.create(name="White", rows=10, seats_in_row=14)
+        self.movie_session = MovieSession.objects.create(movie=movie, cinema_hall=cinema_hall, show_time=datetime.now())
+
+    def test_concurrent_orders_never_double_book(self):
+        results = []
+        barrier = threading.Barrier(len(self.users) * 3)
+
+        def buy(user, seats):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            tickets = [{"row": 1, "seat": seat, "movie_session": self.movie_session.id} for seat in seats]
+            try:
+                barrier.wait()
+                started = time.monotonic()
+                response = client.post("/api/cinema/orders/", {"tickets": tickets}, format="json")
+                results.append((response.status_code, time.monotonic() - started))
+            finally:
+                connection.close()
+
+        threads = []
+        for i, user in enumerate(self.users):
+            # every buyer overlaps with the next one on a single seat
+            seats = [i + 1, i + 2]
+            for _ in range(3):
+                threads.append(threading.Thread(target=buy, args=(user, seats)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        statuses = [code for code, _ in results]
+        self.assertEqual(len(statuses), len(threads))
+        self.assertTrue(set(statuses) <= {status.HTTP_201_CREATED, status.HTTP_409_CONFLICT})
+        self.assertGreater(statuses.count(status.HTTP_201_CREATED), 0)
+        booked = list(Ticket.objects.filter(movie_session=self.movie_session).values_list("row", "seat"))
+        self.assertEqual(len(booked), len(set(booked)))
+        self.assertEqual(len(booked), 2 * statuses.count(status.HTTP_201_CREATED))
+        self.assertLess(max(latency for _, latency in results), 5)
+
+    def test_concurrent_retries_with_idempotency_key_book_once(self):
+        results = []
+        barrier = threading.Barrier(6)
+        tickets = [{"row": 1, "seat": 1, "movie_session": self.movie_session.id}]
+
+        def retry():
+            client = APIClient()
+            client.force_authenticate(user=self.users[0])
+            try:
+                barrier.wait()
+                response = client.post(
+                    "/api/cinema/orders/", {"tickets": tickets}, format="json", headers={"Idempotency-Key": "retry-1"}
+                )
+                results.append((response.status_code, response.data["id"]))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=retry) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual({code for code, _ in results}, {status.HTTP_201_CREATED})
+        self.assertEqual(len({order_id for _, order_id in results}), 1)
+        self.assertEqual(Order.objects.filter(idempotency_key="retry-1").count(), 1)
+        self.assertEqual(Ticket.objects.filter(movie_session=self.movie_session).count(), 1)
+
+
+class TicketsSoldTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username="admin")
+        self.client.force_authenticate(user=self.user)
+        movie = Movie.objects.create(title="Titanic", description="Titanic description", duration=123)
+        cinema_hall = CinemaHall.objects.create(name="White", rows=10, seats_in_row=14)
+        self.sessions = [
+            MovieSession.objects.create(movie=movie, cinema_hall=cinema_hall, show_time=datetime.now())
+            for _ in range(2)
+        ]
+
+    def tickets_sold(self):
+        return [session.tickets_sold for session in MovieSession.objects.order_by("id")]
+
+    def test_tickets_sold_follows_orders_and_tickets(self):
+        response = self.client.post(
+            "/api/cinema/orders/",
+            {"tickets": [{"row": 1, "seat": 1, "movie_session": self.sessions[0].id},
+                         {"row": 1, "seat": 2, "movie_session": self.sessions[0].id},
+                         {"row": 1, "seat": 1, "movie_session": self.sessions[1].id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.tickets_sold(), [2, 1])
+        ticket = Ticket.objects.get(movie_session=self.sessions[0], seat=2)
+        ticket.movie_session = self.sessions[1]
+        ticket.save()
+        self.assertEqual(self.tickets_sold(), [1, 2])
+        ticket.delete()
+        self.assertEqual(self.tickets_sold(), [1, 1])
+        Order.objects.get(id=response.data["id"]).delete()
+        self.assertEqual(self.tickets_sold(), [0, 0])
+
+    def test_reconcile_tickets_sold(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.bulk_create([Ticket(movie_session=self.sessions[1], order=order, row=1, seat=seat) for seat in (1, 2)])
+        out = StringIO()
+        call_command("reconcile_tickets_sold", "--dry-run", stdout=out)
+        self.assertIn(f"Movie session {self.sessions[1].id}: tickets_sold 0, actual 2", out.getvalue())
+        self.assertEqual(self.tickets_sold(), [0, 0])
+        call_command("reconcile_tickets_sold", "--batch-size", "1", stdout=out)
+        self.assertEqual(self.tickets_sold(), [0, 2])
+        out = StringIO()
+        call_command("reconcile_tickets_sold", stdout=out)
+        self.assertIn("Repaired 0 drifted movie sessions", out.getvalue())
@@ -1,5 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from cinema.async_views import (
+    movie_session_detail,
+    movie_session_list,
+    movie_session_seat_events,
+)
 from cinema.views import (
     GenreViewSet,
     ActorViewSet,
@@ -7,6 +12,7 @@ from cinema.views import (
     MovieViewSet,
     MovieSessionViewSet,
     OrderViewSet,
+    MetricsView,
 )
 
 app_name = "cinema"
@@ -21,4 +27,20 @@ router.register("orders", OrderViewSet, basename="orders")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path(
+        "async/movie_sessions/",
+        movie_session_list,
+        name="async-moviesession-list",
+    ),
+    path(
+        "async/movie_sessions/<int:pk>/",
+        movie_session_detail,
+        name="async-moviesession-detail",
+    ),
+    path(
+        "async/movie_sessions/<int:pk>/seat_events/",
+        movie_session_seat_events,
+        name="async-moviesession-seat-events",
+    ),
 ]
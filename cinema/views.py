@@ -1,46 +1,90 @@
-from rest_framework import viewsets, mixins, filters
-from rest_framework.permissions import IsAuthenticated
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from cinema.models import Genre, Actor, CinemaHall, Movie, MovieSession, Order
+from cinema.models import (
+    Genre,
+    Actor,
+    CinemaHall,
+    Movie,
+    MovieSession,
+    Order,
+    Ticket,
+)
+from cinema.booking import (
+    SeatsConflict,
+    find_idempotent_order,
+    release_seat_holds,
+    request_fingerprint,
+)
+from cinema.caching import CachedResponseMixin
+from cinema.day_schedule import get_day_schedule
+from cinema.export import FORMATS, ticket_rows
+from cinema.filters import MovieSearchFilter, filter_by_show_date, parse_date
+from cinema.metrics import registry
+from cinema.seat_map import find_best_seats, get_seat_map
+from cinema.flat_serializers import (
+    FlatMovieListSerializer,
+    FlatMovieSessionListSerializer,
+)
+from cinema.pagination import MovieSessionPagination, OrderPagination
 from cinema.serializers import (
     GenreSerializer,
     ActorSerializer,
     CinemaHallSerializer,
     MovieSerializer,
-    MovieListSerializer,
     MovieDetailSerializer,
     MovieSessionSerializer,
-    MovieSessionListSerializer,
     MovieSessionDetailSerializer,
+    SeatHoldSerializer,
+    SeatHoldCreateSerializer,
+    BestSeatsSerializer,
+    ScheduleImportSerializer,
     OrderSerializer,
     OrderListSerializer,
 )
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_models = (Genre,)
 
 
-class ActorViewSet(viewsets.ModelViewSet):
+class ActorViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
+    cache_models = (Actor,)
 
 
-class CinemaHallViewSet(viewsets.ModelViewSet):
+class CinemaHallViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = CinemaHall.objects.all()
     serializer_class = CinemaHallSerializer
+    cache_models = (CinemaHall,)
 
 
-class MovieViewSet(viewsets.ModelViewSet):
+class MovieViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Movie.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    cache_models = (Movie, Genre, Actor)
+    filter_backends = [DjangoFilterBackend, MovieSearchFilter]
     filterset_fields = ["genres", "actors"]
-    search_fields = ["title"]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = FlatMovieListSerializer.values(
+                queryset.with_names()
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
-            return MovieListSerializer
+            return FlatMovieListSerializer
         if self.action == "retrieve":
             return MovieDetailSerializer
         return MovieSerializer
@@ -49,34 +93,205 @@ class MovieViewSet(viewsets.ModelViewSet):
 class MovieSessionViewSet(viewsets.ModelViewSet):
     queryset = MovieSession.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = MovieSessionPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["movie"]
 
     def get_serializer_class(self):
         if self.action == "list":
-            return MovieSessionListSerializer
+            return FlatMovieSessionListSerializer
         if self.action == "retrieve":
             return MovieSessionDetailSerializer
+        if self.action == "holds":
+            return SeatHoldCreateSerializer
+        if self.action == "best_seats":
+            return BestSeatsSerializer
+        if self.action == "schedule":
+            return ScheduleImportSerializer
         return MovieSessionSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ("holds", "best_seats"):
+            context["movie_session"] = self.get_object()
+        return context
+
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = FlatMovieSessionListSerializer.values(
+                queryset.with_tickets_available()
+            )
+        elif self.action == "retrieve":
+            queryset = queryset.select_related(
+                "movie", "cinema_hall"
+            ).prefetch_related("movie__genres", "movie__actors")
+        elif self.action in ("holds", "best_seats"):
+            queryset = queryset.select_related("cinema_hall")
         date = self.request.query_params.get("date")
         if date:
-            queryset = queryset.filter(show_time__date=date)
+            queryset = filter_by_show_date(queryset, date)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        date = request.query_params.get("date")
+        movie = request.query_params.get("movie")
+        if movie is not None:
+            try:
+                movie = int(movie)
+            except ValueError:
+                # left to the filter, which rejects it with a 400
+                date = None
+        if not date:
+            return super().list(request, *args, **kwargs)
+        # the home page query, served from the day's cached schedule
+        rows = get_day_schedule(parse_date(date, "date"))
+        if movie is not None:
+            rows = [row for row in rows if row["movie"] == movie]
+            if not rows:
+                # an unknown movie is the filter's 400, as without ?date=
+                self.filter_queryset(self.get_queryset())
+        page = self.paginator.paginate_rows(rows, request)
+        return self.get_paginated_response(
+            FlatMovieSessionListSerializer(page).data
+        )
+
+    @action(detail=True, methods=["post", "delete"])
+    def holds(self, request, pk=None):
+        if request.method == "DELETE":
+            release_seat_holds(request.user, self.get_object())
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        holds = serializer.save()
+        return Response(
+            SeatHoldSerializer(holds, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=["get", "post"])
+    def best_seats(self, request, pk=None):
+        """Suggest (GET ``?count=``) or hold (POST) adjacent best seats."""
+        if request.method == "GET":
+            serializer = self.get_serializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            movie_session = serializer.context["movie_session"]
+            seats = find_best_seats(
+                get_seat_map(movie_session),
+                serializer.validated_data["count"],
+                movie_session.cinema_hall.seat_layout.blocked,
+            )
+            return Response(
+                {"seats": [{"row": row, "seat": seat} for row, seat in seats]}
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        holds = serializer.save()
+        return Response(
+            SeatHoldSerializer(holds, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["post"], permission_classes=[IsAdminUser])
+    def schedule(self, request):
+        """Create a batch of sessions, e.g. a week, if none of them overlap."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        movie_sessions = serializer.save()
+        return Response(
+            MovieSessionSerializer(movie_sessions, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
 
 class OrderViewSet(mixins.ListModelMixin,
                    mixins.CreateModelMixin,
                    viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderPagination
 
     def get_queryset(self):
         # повертаємо тільки замовлення залогіненого користувача
-        return Order.objects.filter(user=self.request.user)
+        queryset = Order.objects.filter(user=self.request.user)
+        if self.action == "list":
+            queryset = queryset.prefetch_related(
+                Prefetch("tickets", queryset=Ticket.objects.order_by("id")),
+                Prefetch(
+                    "tickets__movie_session",
+                    queryset=MovieSession.objects.with_tickets_available(),
+                ),
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
             return OrderListSerializer
         return OrderSerializer
+
+    def create(self, request, *args, **kwargs):
+        """Book once per ``Idempotency-Key``; retries replay the order."""
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not 1 <= len(key) <= 255:
+            raise ValidationError(
+                {"Idempotency-Key": "Must be 1 to 255 characters long."}
+            )
+        fingerprint = request_fingerprint(request.data)
+        order = find_idempotent_order(request.user, key, fingerprint)
+        if order is None:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                serializer.save(
+                    idempotency_key=key, request_fingerprint=fingerprint
+                )
+            except SeatsConflict:
+                # a concurrent retry with the same key may have won
+                order = find_idempotent_order(request.user, key, fingerprint)
+                if order is None:
+                    raise
+            else:
+                return Response(
+                    serializer.data, status=status.HTTP_201_CREATED
+                )
+        return Response(
+            self.get_serializer(order).data,
+            status=status.HTTP_201_CREATED,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream the tickets of all orders as ``?output=csv`` or ``ndjson``.
+
+        ``created_after`` and ``created_before`` (YYYY-MM-DD, inclusive)
+        limit the orders by creation date.
+        """
+        output = request.query_params.get("output", "csv")
+        if output not in FORMATS:
+            raise ValidationError(
+                {"output": f"Choose one of: {', '.join(FORMATS)}."}
+            )
+        range_params = {
+            param: parse_date(request.query_params[param], param)
+            for param in ("created_after", "created_before")
+            if param in request.query_params
+        }
+        render, content_type = FORMATS[output]
+        response = StreamingHttpResponse(
+            render(ticket_rows(**range_params)), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="orders.{output}"'
+        )
+        return response
+
+
+class MetricsView(APIView):
+    """Per-view request metrics aggregated by this process."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(registry.snapshot())
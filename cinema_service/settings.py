@@ -1,21 +1,50 @@
 """
 Django settings for cinema_service project.
 Generated by 'django-admin startproject' using Django 4.0.4.
+
+The deployment profile is picked with the ``CINEMA_PROFILE`` environment
+variable:
+
+* ``dev`` (default): SQLite, ``DEBUG`` and the debug toolbar.
+* ``sqlite``: single-node production on SQLite in WAL mode.
+* ``postgres``: PostgreSQL with persistent connections, or with
+  Django's connection pool when ``POSTGRES_POOL_MAX_SIZE`` is set
+  (needs ``psycopg[pool]``).
 """
 
-from pathlib import Path
+import os
 import sys
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = (
-    "django-insecure-6vubhk2$++agnctay_4pxy_8cq)"
-    "mosmn(*-#2b^v4cgsh-^!i3"
-)
+PROFILE = os.environ.get("CINEMA_PROFILE", "dev")
+if PROFILE not in ("dev", "sqlite", "postgres"):
+    raise ImproperlyConfigured(f"Unknown CINEMA_PROFILE {PROFILE!r}.")
 
-DEBUG = True
+# Визначаємо, чи запускаються тести
+IS_TESTING = "test" in sys.argv
 
-ALLOWED_HOSTS = []
+if PROFILE == "dev":
+    SECRET_KEY = (
+        "django-insecure-6vubhk2$++agnctay_4pxy_8cq)"
+        "mosmn(*-#2b^v4cgsh-^!i3"
+    )
+elif "DJANGO_SECRET_KEY" in os.environ:
+    SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+else:
+    raise ImproperlyConfigured(
+        f"Set DJANGO_SECRET_KEY for the {PROFILE} profile."
+    )
+
+DEBUG = os.environ.get("DJANGO_DEBUG", str(PROFILE == "dev")) == "True"
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",")
+    if host
+]
 
 INTERNAL_IPS = [
     "127.0.0.1",
@@ -30,14 +59,13 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "django_filters",
-    "debug_toolbar",
     "cinema",
     "user",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "cinema.metrics.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -46,15 +74,10 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-# Визначаємо, чи запускаються тести
-IS_TESTING = "test" in sys.argv
-
-if IS_TESTING:
-    # Вимикаємо debug toolbar під час тестів
-    INSTALLED_APPS = [app for app in INSTALLED_APPS
-                      if app != "debug_toolbar"]
-    MIDDLEWARE = [mw for mw in MIDDLEWARE
-                  if mw != "debug_toolbar.middleware.DebugToolbarMiddleware"]
+# debug toolbar тільки для розробки і не під час тестів
+if PROFILE == "dev" and DEBUG and not IS_TESTING:
+    INSTALLED_APPS.insert(INSTALLED_APPS.index("cinema"), "debug_toolbar")
+    MIDDLEWARE.insert(1, "debug_toolbar.middleware.DebugToolbarMiddleware")
 
 ROOT_URLCONF = "cinema_service.urls"
 
@@ -76,12 +99,56 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "cinema_service.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+if PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "cinema"),
+            "USER": os.environ.get("POSTGRES_USER", "cinema"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        }
     }
-}
+    if "POSTGRES_POOL_MAX_SIZE" in os.environ:
+        # the pool keeps connections open itself, so CONN_MAX_AGE stays 0
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", 2)),
+                "max_size": int(os.environ["POSTGRES_POOL_MAX_SIZE"]),
+                "timeout": int(os.environ.get("POSTGRES_POOL_TIMEOUT", 10)),
+            },
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(
+            os.environ.get("DB_CONN_MAX_AGE", 60)
+        )
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            # unlike the default in-memory test database, a file lets the
+            # concurrency tests wait on each other's locks as in production
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+    if PROFILE == "sqlite":
+        DATABASES["default"]["CONN_MAX_AGE"] = None
+        DATABASES["default"]["OPTIONS"] = {
+            # writers take the lock up front instead of failing to upgrade
+            # a read transaction, and wait for it up to the timeout
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+            "init_command": (
+                "PRAGMA journal_mode = WAL;"
+                "PRAGMA synchronous = NORMAL;"
+                "PRAGMA temp_store = MEMORY;"
+                "PRAGMA cache_size = -65536;"
+                "PRAGMA mmap_size = 268435456;"
+            ),
+        }
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -123,6 +190,42 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# how long a seat stays held while its buyer is checking out
+SEAT_HOLD_TTL_SECONDS = 10 * 60
+
+# how long a retried order with the same Idempotency-Key is replayed
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 60 * 60
+
+# most queries a request to each view may run, counting the session and
+# user lookups of session authentication
+CINEMA_QUERY_BUDGETS = {
+    "APIRootView.get": 2,
+    "GenreViewSet.list": 3,
+    "GenreViewSet.retrieve": 3,
+    "ActorViewSet.list": 3,
+    "ActorViewSet.retrieve": 3,
+    "CinemaHallViewSet.list": 3,
+    "CinemaHallViewSet.retrieve": 3,
+    "MovieViewSet.list": 4,
+    "MovieViewSet.retrieve": 5,
+    "MovieSessionViewSet.list": 4,
+    "MovieSessionViewSet.retrieve": 7,
+    "MovieSessionViewSet.holds": 9,
+    "MovieSessionViewSet.best_seats": 9,
+    # orders plus their tickets and movie sessions
+    "OrderViewSet.list": 5,
+    # one more per additional movie session in the order, and one for
+    # looking up an Idempotency-Key
+    "OrderViewSet.create": 12,
+    "OrderViewSet.export": 3,
+    # one more to tell an unknown movie from one with no sessions
+    "async_views.movie_session_list": 4,
+    "async_views.movie_session_detail": 6,
+    "MetricsView.get": 2,
+}
+# over-budget requests fail instead of logging a warning
+CINEMA_ENFORCE_QUERY_BUDGETS = IS_TESTING
+
 # ---------------- DRF SETTINGS ----------------
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [